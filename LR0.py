@@ -1,4 +1,5 @@
-from typing import Dict, List, Tuple, Union
+from itertools import chain
+from typing import Dict, Iterable, List, Tuple, Union
 
 import pydotplus
 from tabulate import tabulate
@@ -320,19 +321,19 @@ class LR0:
 
         return dot
 
-    def parse(self, tokens: List[str], ignore: List[str]) -> bool:
+    def parse(self, tokens: Iterable[str], ignore: List[str]) -> bool:
         stack = [0]
-        tokens.append("$")
-        token_index = 0
+        # Tokens may come from a stream, so they are consumed one at a time
+        tokens = chain(tokens, ["$"])
+        symbol = next(tokens)
 
         while True:
 
             top = stack[-1]
-            symbol = tokens[token_index]
 
             if symbol in ignore:
                 print("Ignoring token:", symbol)
-                token_index += 1
+                symbol = next(tokens)
                 continue
 
             action = self.table[top].get(symbol)
@@ -350,7 +351,7 @@ class LR0:
             if action.startswith("S"):
                 state = action[1:]
                 stack.extend([symbol, int(state)])
-                token_index += 1
+                symbol = next(tokens)
             elif action.startswith("R"):
                 rule = action[1:]
                 nt, rhs = self.grammar["P"][int(rule)]
@@ -1,83 +1,76 @@
 # Scanner generated automatically by Yalex. Do not modify this file.
-import pickle
+from automata.scanner import scan_stream
+from automata.table import DEAD, TransitionTable
+from automata.errors import ErrorSink
+from automata.positions import LineIndex
+from automata.token_stream import TokenStreamWriter
 
 print("header")
+digit="digit"
+ws="ws"
 
-def execute_action(action, token):
-    local_namespace = {}
+def action_0(token):
+    return ws
 
-    function_code = f'def temporary_function():\n'
-    if action:
-        function_code += f'    {action}\n'
-    else:
-        print("Empty action detected for token:", token)
-        function_code += f'    pass\n'
 
-    function_code += 'result = temporary_function()'
+def action_1(token):
+    return "id"
 
+
+def action_2(token):
+    return "TOKON1"
+
+
+def action_3(token):
+    return "TOKON2"
+
+
+def action_4(token):
+    return "TOKON3"
+
+
+def action_5(token):
+    return "TOKON4"
+
+
+ACTIONS = [action_0, action_1, action_2, action_3, action_4, action_5]
+LABELS = ['ws', 'id', "'+'", "'*'", "'('", "')'"]
+
+def execute_action(token_id, token):
     try:
-        exec(function_code, globals(), local_namespace)
-        return local_namespace['result']
+        return ACTIONS[token_id](token)
     except Exception as e:
-        # if its not defined, simply print the name of the token    
-        
-  
-
-        print(f"Error executing the action: {e}")
+        print(f"Error executing the action of {LABELS[token_id]}: {e}")
         return None
 
-def recognize_tokens(dfa, file_path):
-
-    recognized_tokens = []
-
-
-    # Read the file
-    with open(file_path, "r") as file:
-        data = file.read()
-        
-    start = 0
-    while start < len(data):
-        current_state = dfa.initial_state
-        current_token = ""
-        last_accept_position = start
-        last_accept_state = None
-        i = start
-
-        while i < len(data):
-            char = data[i]
-            if char in current_state.transitions:
-                current_state = current_state.transitions[char]
-                current_token += char
-                if current_state.accepting:
-                    last_accept_position = i + 1
-                    last_accept_state = current_state
-                i += 1
-            else:
-                break
-
-        if last_accept_state:
-            # Perform action associated with the last accept state
-            recognized_token = data[start:last_accept_position]
-            action_result = execute_action(last_accept_state.action, recognized_token)
-            if action_result is not None:
-                print("Action:", action_result, "from token:", recognized_token)
-                recognized_tokens.append(action_result)
+
+def recognize_tokens(table, file_path):
+
+    # Tokens are scanned from the file chunk by chunk and written to
+    # tokens.bin as they come. Errors go to errors.jsonl; lines are only
+    # indexed once an error needs them
+    errors = ErrorSink("errors.jsonl", LineIndex.from_file(file_path))
+    with open(file_path, "r") as file, TokenStreamWriter("tokens.bin", lexemes=True) as output, errors:
+        for token_id, start, end, recognized_token in scan_stream(table, file):
+            if token_id != DEAD:
+                # Perform action associated with the accepted token
+                action_result = execute_action(token_id, recognized_token)
+                if action_result is not None:
+                    print("Action:", action_result, "from token:", recognized_token)
+                    output.write(action_result, start, end, recognized_token)
+                else:
+                    print("Warning: No valid action defined for token:", recognized_token)
             else:
-                print("Warning: No valid action defined for token:", recognized_token)
-            start = last_accept_position
-        else:
-            # No valid transition found, report an error
-            print("Lexical error:", data[start], "at position", start)
-            start += 1
+                # No valid transition found, report the whole invalid run
+                errors.report(start, end, recognized_token)
 
-    # save the tokens to a new file, comma separated
-    with open("tokens.txt", "w") as file:
-        file.write(",".join(recognized_tokens))
+    if errors.count:
+        print("Lexical errors:", errors.count, "(see errors.jsonl)")
 
-with open("dfa.pkl", "rb") as file:
-    dfa = pickle.load(file)
+# Fails if dfa.bin was generated from a different spec
+table = TransitionTable.load("dfa.bin", "c577baff8d27e30387a6879d3469bfb681a89d3d10d7c0a2a1f423a325015ee3")
 
-recognize_tokens(dfa, "test.txt")
+recognize_tokens(table, "test.txt")
     
 
 print("trailer")
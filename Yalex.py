@@ -1,20 +1,58 @@
+import hashlib
 import re
 
 from automata.directDfa import DirectDFA
 from automata.Regex import Regex
 from automata.syntax_tree import SyntaxTree
+from automata.table import DEAD, OTHER
 from utils import print_definitions, print_rules
 
+LITERAL = re.compile(r'"([^"]+)"')
+
+
+def split_rules(text):
+    # Splits the rules at their | separators, leaving the ones quoted in
+    # '|' or "||" alone
+    parts, start, quote = [], 0, None
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char == "\\":
+            i += 1
+        elif quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char == "|":
+            parts.append(text[start:i])
+            start = i + 1
+        i += 1
+    parts.append(text[start:])
+    return parts
+
+
+def accepts(dfa, lexeme):
+    state = dfa.initial_state
+    for char in lexeme:
+        state = state.transitions.get(dfa.class_of.get(char, OTHER))
+        if state is None:
+            return False
+    return state.accepting
+
 
 class Yalex:
     """
     Parses a Yalex file, returning the final regex and the rules.
     """
 
-    def __init__(self, filename: str, debug=False):
+    def __init__(self, filename: str, debug=False, resolve=True):
         self.definitions = {}
         self.rules = {}
         self.debug = debug
+        with open(filename, "rb") as f:
+            # Recorded in the compiled lexer to detect stale artifacts
+            self.hash = hashlib.sha256(f.read()).hexdigest()
         self.parse_definitions(filename)
         self.parse_rules(filename)
         self.parse_header(filename)
@@ -24,21 +62,79 @@ class Yalex:
 
             print_definitions(self.definitions)
 
-        def replace_keywords(rule):
-            if rule in self.definitions:
-                return self.definitions[rule]
-            return rule
-
+        self.spec_rules = [(v[0], v[1]) for k, v in self.rules.items() if v[0] != ""]
+
+        # Without `resolve`, the keyword analysis, which builds an automaton
+        # per rule, waits for an explicit call, e.g. after a cache miss
+        if resolve:
+            self.resolve()
+
+    def expand(self, rule):
+        if rule in self.definitions:
+            return self.definitions[rule]
+        return rule
+
+    def resolve(self, tables=None):
+        """
+        Sets the tokens, keywords and regexes of the rules. `tables` are
+        optional TransitionTables of every rule in `spec_rules`, built on
+        their own, which answer the keyword analysis instead of new automata.
+        """
+        rules = self.spec_rules
+
+        # Keywords shadowed by another rule go to a lookup table instead of
+        # the automaton; their rules are numbered after the automaton's
+        shadowed = self.find_keywords(rules, self.expand, tables)
+        self.automaton = [i for i in range(len(rules)) if i not in shadowed]
+        order = self.automaton + sorted(shadowed)
+        self.tokens = [rules[i] for i in order]
+
+        self.keywords = {}
+        for token_id, index in enumerate(order):
+            # The keyword only wins when it is listed before that rule
+            if index in shadowed and index < shadowed[index]:
+                lexeme = LITERAL.fullmatch(rules[index][0]).group(1)
+                self.keywords.setdefault(lexeme, token_id)
+
+        # Regexes of the rules in the automaton, in token id order
+        self.rule_regexes = [self.expand(rules[i][0]) for i in self.automaton]
         self.final_regex = (
-            "("
-            + "|".join(
-                replace_keywords(rule[0]) + "※"
-                for rule in self.rules.values()
-                if rule[0] != ""
-            )
-            + ")"
+            "(" + "|".join(regex + "※" for regex in self.rule_regexes) + ")"
         )
-        self.tokens = [(v[0], v[1]) for k, v in self.rules.items() if v[0] != ""]
+
+    def find_keywords(self, rules, expand, tables=None):
+        """
+        Finds the literal string rules whose lexeme is also matched by a rule
+        that is not a literal, like "while" next to id. A literal accepts
+        only its own whole lexeme, and the other rule accepts that lexeme
+        too, so dropping the literal from the automaton never changes the
+        length of the longest match; the keyword table gives the match its
+        token id back. Returns {literal rule index: index of the first rule
+        that matches its lexeme}.
+        """
+        literals = {
+            i: LITERAL.fullmatch(regex).group(1)
+            for i, (regex, _) in enumerate(rules)
+            if LITERAL.fullmatch(regex)
+        }
+        if not literals:
+            return {}
+
+        shadowed = {}
+        for index, (regex, _) in enumerate(rules):
+            if index in literals:
+                continue
+            if tables:
+                table = tables[index]
+                matches = lambda lexeme: table.match(lexeme) != DEAD
+            else:
+                tree = SyntaxTree(Regex("(" + expand(regex) + "※)").shunting_yard())
+                dfa = DirectDFA().generate_direct_dfa(tree, tree.root)
+                matches = lambda lexeme: accepts(dfa, lexeme)
+            for literal_index, lexeme in literals.items():
+                if literal_index not in shadowed and matches(lexeme):
+                    shadowed[literal_index] = index
+        return shadowed
 
     def parse_header(self, filename: str) -> None:
         with open(filename, "r") as f:
@@ -124,7 +220,7 @@ class Yalex:
             tokens_part = content[equal_index + 1 :]
 
             # Split by '|'
-            tokens = tokens_part.split("|")
+            tokens = split_rules(tokens_part)
 
             token_info = []
             for token in tokens:
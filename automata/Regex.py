@@ -1,4 +1,66 @@
-import string
+import re
+
+# Bounded repetition: {m}, {m,} or {m,n}
+REPETITION = re.compile(r"\{(\d+)(,(\d*))?\}")
+
+
+MAX_CODE = 0x10FFFF
+
+# A bare ※ in a regex ends a rule. It becomes this token, which is not a
+# character, so the marker stays out of the character classes and a ※ in
+# the input (quoted '※' in a spec, or inside a set) is matched like any other
+END_MARKER = "※"
+R_END = "※end"
+
+
+class CharSet(tuple):
+    """
+    Leaf of a character class: sorted, disjoint (low, high) code point
+    intervals, bounds included. The whole set is one position of the syntax
+    tree however many characters it holds.
+    """
+
+    def __new__(cls, intervals, negated=False):
+        merged = []
+        for low, high in sorted(intervals):
+            if merged and low <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+            else:
+                merged.append((low, high))
+
+        if negated:
+            complement, low = [], 0
+            for start, end in merged:
+                if start > low:
+                    complement.append((low, start - 1))
+                low = end + 1
+            if low <= MAX_CODE:
+                complement.append((low, MAX_CODE))
+            merged = complement
+
+        return super().__new__(cls, merged)
+
+    def __str__(self):
+        return "[" + "".join(
+            chr(low) if low == high else f"{chr(low)}-{chr(high)}" for low, high in self
+        ) + "]"
+
+
+# `_`: any printable ASCII character
+ANY = CharSet([(32, 126)])
+
+
+def repetition_bounds(token):
+    # (m, n) of a repetition token, n is None when unbounded
+    if not isinstance(token, str):
+        return None
+    match = REPETITION.fullmatch(token)
+    if match is None:
+        return None
+    low = int(match.group(1))
+    if match.group(2) is None:
+        return low, low
+    return low, int(match.group(3)) if match.group(3) else None
 
 
 class Regex:
@@ -61,6 +123,9 @@ class Regex:
                         else:
                             _str += regex[i]
                     else:
+                        # Quoted operators are plain characters
+                        if regex[i] in reserved:
+                            _str += '\\'
                         _str += regex[i]
                         
                     i += 1
@@ -123,6 +188,11 @@ class Regex:
                 tokens.append(char)
                 i += 1
 
+            elif char == '{' and REPETITION.match(regex, i):
+                repetition = REPETITION.match(regex, i).group()
+                tokens.append(repetition)
+                i += len(repetition)
+
             elif char in {'(', ')'}:
                 tokens.append(char)
                 i += 1
@@ -134,7 +204,7 @@ class Regex:
                          raise ValueError("Dot must be escaped in regex")
     
                 else:
-                    tokens.append(char)
+                    tokens.append(R_END if char == END_MARKER else char)
                     i += 1
             
         return tokens
@@ -148,140 +218,61 @@ class Regex:
         
         tokens = self.tokens
         
-        def handle_operator(index, operator, empty_symbol='ε'):
-            nonlocal tokens
-            if tokens[index - 1] != ')':
-                if operator == '+':
-                    tokens[index - 1:index + 1] = ['(',tokens[index - 1], tokens[index - 1], '*',')']
-                elif operator == '?':
-                    tokens[index - 1:index + 1] = ['(', tokens[index - 1], '|', empty_symbol, ')']
-            else:
-                j = index - 2
-                count = 0
-                while j >= 0 and (tokens[j] != '(' or count != 0):
-                    if tokens[j] == ')':
-                        count += 1
-                    elif tokens[j] == '(':
-                        count -= 1
-                    j -= 1
-                if tokens[j] == '(' and count == 0:
-                    if operator == '+':
-                        tokens[j:index + 1] = ['(']+tokens[j:index] + tokens[j:index] + ['*'] +[')']
-                    elif operator == '?':
-                        tokens[j:index + 1] = ['('] + tokens[j:index] + ['|', empty_symbol, ')']
-        
-        #Funcion para reconstruir todas las clases en un solo formato ["abc..."]
+        #Funcion para reconstruir una clase como un solo conjunto de intervalos
         def expand_character_class(char_class):
-            characters = []
+            intervals = []
             complement = False
-            i=0
-            while i < len(char_class):
+            i=1
+            while i < len(char_class) - 1:
                 c = char_class[i]
                 if c=='^':
                     complement = True
                 #Comillas simples
                 elif c=="'":
                     if char_class[i+1]=='\\':
-                        characters.append(char_class[i+2])
+                        char = char_class[i+2]
                         i+=1
                     else:
-                        characters.append(char_class[i+1])
+                        char = char_class[i+1]
+                    intervals.append((ord(char), ord(char)))
                     i+=2
                 #Guion
                 elif c=="-":
-                    start = characters.pop()
+                    start, _ = intervals.pop()
                     end = char_class[i+2]
-                    
-                    for c in range(ord(start), ord(end) + 1):
-                        characters.append(chr(c))
+                    intervals.append((start, ord(end)))
                     i+=3
                 #Comillas dobles (sin escape de ")
                 elif c=='"':
                     j=i+1
-                    while j<len(char_class):
-                        if char_class[j]!='"':
-                            characters.append(char_class[j])
-                        else:
-                            break
+                    while j<len(char_class) and char_class[j]!='"':
+                        intervals.append((ord(char_class[j]), ord(char_class[j])))
                         j+=1
                     i=j
                 i+=1
-            
-            if not complement:
-                expanded = ''.join(item for item in characters)
-                return expand_string('"'+expanded+'"')
-            else:
-                return None
-            
-                
-
-        #Funcion para reconstruir la clase en formato ["abc.."] en (a|b|c...)    
-        def expand_string(_str):
-            reserved = ['|','*','.','(',')','+','?',"'",'"']
-            expanded = []
-            
-            char_class = _str[1:-1]
-            for c in char_class:
-                if c in reserved:
-                    expanded.append('\\'+c)
-                else:
-                    expanded.append(c)
-                expanded.append('|')
-            
-            expanded.pop()
-            return ['('] + [char for char in expanded] + [')']
-        
-        #Funcion para expandir (_)
-        def expand_characters():
-            characters = []
-            reserved = ['|','*','.','(',')','+','?',"'",'"']
-            caracteres_ascii = [chr(i) for i in range(32,127)]
-            
-            for c in caracteres_ascii:
-                if c in reserved:
-                    characters.append('\\'+c)
-                elif c=='\\':
-                    characters.append(str(ord(c)))
-                else:
-                    characters.append(c)
-                characters.append('|')
-            characters.pop()
-            
-            return ['('] + [char for char in characters] + [')']
-                    
 
-        i = 0
-        while i < len(tokens):
-            if tokens[i] == '+':
-                handle_operator(i, '+')
-                continue  
-            i += 1
+            return CharSet(intervals, negated=complement)
 
-        i = 0
-        while i < len(tokens):
-            if tokens[i] == '?':
-                handle_operator(i, '?')
-                continue
-            i += 1
-            
         i = 0
         while i < len(tokens):
             token = tokens[i]
             
             if token.startswith('[') and token.endswith(']'):
-                expanded_tokens = expand_character_class(token)
-                res.extend(expanded_tokens)
-                
+                res.append(expand_character_class(token))
+
             elif token=='_':
-                expanded_tokens = expand_characters()
-                res.extend(expanded_tokens)
-                
+                res.append(ANY)
+
             else:
                 res.append(token)
                 
             if i + 1 < len(tokens):
                 next_token = tokens[i + 1]
-                if token not in binaryOperators + ['('] and next_token not in allOperators + [')', '.']:
+                if (
+                    token not in binaryOperators + ['(']
+                    and next_token not in allOperators + [')', '.']
+                    and repetition_bounds(next_token) is None
+                ):
                     res.append('.')
             i += 1
             
@@ -290,7 +281,7 @@ class Regex:
 
     def shunting_yard(self):
         postfix, stack = [], []
-        operators = ["|", "*", "."]
+        operators = ["|", "*", ".", "+", "?"]
 
         regex = self.formatted_regex
         i = 0
@@ -305,10 +296,9 @@ class Regex:
                     stack.pop()
                 else:
                     raise ValueError("Mismatched parentheses.")
-            elif char in operators:
-                while stack and self.precedence.get(
-                    stack[-1], 0
-                ) >= self.precedence.get(char, 0):
+            elif char in operators or repetition_bounds(char) is not None:
+                precedence = self.precedence.get(char, 4)
+                while stack and self.precedence.get(stack[-1], 4) >= precedence:
                     postfix.append(stack.pop())
                 stack.append(char)
             else:
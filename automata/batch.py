@@ -0,0 +1,126 @@
+from automata.scanner import scan
+from automata.table import DEAD, OTHER
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def class_ids(table, text):
+    # Column of every character of `text`, looked up all at once
+    codes = numpy.frombuffer(text.encode("utf-32-le", "surrogatepass"), numpy.uint32)
+    class_map = numpy.frombuffer(table.class_map, numpy.uint16)
+    classes = class_map[numpy.minimum(codes, 255)].astype(numpy.int64)
+    wide = numpy.flatnonzero(codes > 255)
+    classes[wide] = OTHER
+    if table.wide_classes:
+        for i in wide.tolist():
+            classes[i] = table.wide_classes.get(text[i], OTHER)
+    return classes
+
+
+def scan_batch(table, documents):
+    """
+    Tokenizes many documents at once and returns, for each of them, the list
+    of `(token_id, start, end)` that `scan` would yield for it.
+
+    Every document is a lane with its own state, read position and last
+    accept. Each iteration steps all lanes by one character with a NumPy
+    gather on the transition table; lanes whose walk ended emit their token
+    and restart after it, or drop out at the end of their document. Error
+    characters are emitted one by one and merged into runs at the end.
+    Without NumPy the documents are scanned one by one.
+    """
+    documents = list(documents)
+    if numpy is None:
+        return [list(scan(table, document)) for document in documents]
+
+    lengths = numpy.array([len(document) for document in documents], numpy.int64)
+    ends = numpy.cumsum(lengths)
+    begins = ends - lengths
+    classes = class_ids(table, "".join(documents))
+
+    # DEAD becomes an extra sink row, so a gather never needs a branch
+    sink, width = table.size, table.width
+    dense = numpy.frombuffer(table.transitions, numpy.int32)
+    transitions = numpy.full((sink + 1) * width, sink, numpy.int64)
+    transitions[: sink * width] = numpy.where(dense == DEAD, sink, dense)
+    accept = numpy.append(numpy.frombuffer(table.accept, numpy.int32), DEAD)
+
+    lane = numpy.flatnonzero(lengths)
+    end = ends[lane]
+    start = begins[lane]
+    i = start.copy()
+    state = numpy.full(len(lane), table.initial, numpy.int64)
+    last_position = start.copy()
+    last_token = numpy.full(len(lane), DEAD, numpy.int64)
+
+    emitted = []
+    while len(lane):
+        state = transitions[state * width + classes[i]]
+        alive = state != sink
+        i += alive
+        token = accept[state]
+        hit = alive & (token != DEAD)
+        last_position = numpy.where(hit, i, last_position)
+        last_token = numpy.where(hit, token, last_token)
+
+        done = numpy.flatnonzero(~alive | (i == end))
+        if not len(done):
+            continue
+
+        # Longest match per lane: the last accept, or one error character
+        matched = last_token[done] != DEAD
+        token_end = numpy.where(matched, last_position[done], start[done] + 1)
+        emitted.append((lane[done], last_token[done], start[done], token_end))
+
+        start[done] = i[done] = token_end
+        state[done] = table.initial
+        last_token[done] = DEAD
+
+        active = start < end
+        if not active.all():
+            lane, end, start, i = lane[active], end[active], start[active], i[active]
+            state, last_position = state[active], last_position[active]
+            last_token = last_token[active]
+
+    if not emitted:
+        return [[] for _ in documents]
+
+    # Emissions of a lane are in order, so a stable sort groups them per document
+    lanes, token_ids, starts, token_ends = (
+        numpy.concatenate(part) for part in zip(*emitted)
+    )
+    order = numpy.argsort(lanes, kind="stable")
+    lanes, token_ids, starts, token_ends = (
+        lanes[order],
+        token_ids[order],
+        starts[order],
+        token_ends[order],
+    )
+
+    # Like scan, a run of characters that start no token is one error token
+    run = (token_ids == DEAD) & (
+        transitions[table.initial * width + classes[starts]] == sink
+    )
+    merged = run[1:] & run[:-1] & (lanes[1:] == lanes[:-1])
+    if merged.any():
+        kept = numpy.flatnonzero(numpy.append(True, ~merged))
+        last = numpy.append(kept[1:], len(lanes)) - 1
+        token_ends = token_ends[last]
+        lanes, token_ids, starts = lanes[kept], token_ids[kept], starts[kept]
+
+    starts = starts - begins[lanes]
+    token_ends = token_ends - begins[lanes]
+    found = list(zip(token_ids.tolist(), starts.tolist(), token_ends.tolist()))
+
+    if table.keywords:
+        rules = numpy.array(sorted(table.keyword_rules), numpy.int64)
+        for k in numpy.flatnonzero(numpy.isin(token_ids, rules)).tolist():
+            token_id, token_start, token_end = found[k]
+            lexeme = documents[lanes[k]][token_start:token_end]
+            found[k] = table.keywords.get(lexeme, token_id), token_start, token_end
+
+    bounds = numpy.cumsum(numpy.bincount(lanes, minlength=len(documents))).tolist()
+    return [found[a:b] for a, b in zip([0] + bounds[:-1], bounds)]
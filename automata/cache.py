@@ -0,0 +1,109 @@
+import hashlib
+import os
+import tempfile
+
+from automata.table import VERSION, TransitionTable
+
+CACHE_DIR = ".lexer_cache"
+MAX_SIZE = 64 << 20  # bytes kept on disk before the least recently used go
+GENERATOR = 2  # bump when the construction changes what a spec compiles to
+
+
+def normalized_spec(file_path):
+    # Line endings and trailing blanks do not change what a spec compiles to
+    with open(file_path, "rb") as file:
+        lines = file.read().decode("utf-8").splitlines()
+    return "\n".join(line.rstrip() for line in lines).strip() + "\n"
+
+
+class LexerCache:
+    """
+    Compiled lexers on disk, content-addressed by the hash of the normalized
+    .yal spec, the generator and table versions and the build options.
+
+    Every entry is a table file as written by TransitionTable.save, with its
+    key as the recorded hash, so a hit is one read and a wrong or damaged
+    file is rejected by `load`. Entries are written to a temporary file and
+    renamed into place, which is atomic, so parallel builds sharing the
+    directory never see half an entry; losing a race to another writer or
+    to an eviction only costs a rebuild. A hit refreshes the entry's
+    modification time, and `put` drops the least recently used entries once
+    the directory grows past `max_size` bytes.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_size=MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, file_path, options=""):
+        return self.content_key(normalized_spec(file_path), options)
+
+    def content_key(self, content, options=""):
+        # Key of anything compiled from `content`, e.g. a single rule
+        digest = hashlib.sha256()
+        digest.update(f"{GENERATOR}:{VERSION}:{options}\n".encode("utf-8"))
+        digest.update(content.encode("utf-8"))
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".bin")
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            table = TransitionTable.load(path, key)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            # Written by another version, or damaged: rebuild it
+            self.remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            # Evicted by another process since it was loaded
+            pass
+        return table
+
+    def put(self, key, table):
+        self.store(key, table)
+        self.evict(keep=self.path(key))
+
+    def store(self, key, table):
+        # `put` without the eviction, for callers storing many entries at once
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(handle)
+        try:
+            table.save(temporary, key)
+            os.replace(temporary, self.path(key))
+        except BaseException:
+            self.remove(temporary)
+            raise
+
+    def evict(self, keep=None):
+        entries, size = [], 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".bin"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.path != keep:
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                else:
+                    size = stat.st_size
+
+        size += sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            self.remove(path)
+            size -= entry_size
+
+    @staticmethod
+    def remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
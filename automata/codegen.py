@@ -0,0 +1,168 @@
+from textwrap import dedent, indent
+
+from automata.scanner import start_chars
+from automata.table import DEAD, class_pattern
+
+
+def action_body(action):
+    # The first line follows the opening brace, the rest keep their own
+    # relative indentation
+    lines = action.strip().splitlines()
+    rest = dedent("\n".join(lines[1:]))
+    return "\n".join([lines[0].strip()] + ([rest] if rest.strip() else []))
+
+
+EXECUTE_ACTION = """
+
+ACTIONS = [{names}]
+LABELS = [{labels}]
+
+def execute_action(token_id, token):
+    try:
+        return ACTIONS[token_id](token)
+    except Exception as e:
+        print(f"Error executing the action of {{LABELS[token_id]}}: {{e}}")
+        return None
+"""
+
+
+def generate_actions(rule_tokens):
+    """
+    Source of one function per rule, of the ACTIONS/LABELS tables indexed by
+    token id and of `execute_action`, which runs them, so every action is
+    compiled once with the scanner module.
+    """
+    functions = []
+    for token_id, (token, action) in enumerate(rule_tokens):
+        if action:
+            body = action_body(action)
+        else:
+            body = 'print("Empty action detected for token:", token)'
+
+        function = f"def action_{token_id}(token):\n{indent(body, '    ')}\n"
+        try:
+            compile(function, f"<action of {token}>", "exec")
+        except SyntaxError as e:
+            raise ValueError(f"Invalid action for rule {token}: {e.msg}")
+        functions.append(function)
+
+    names = ", ".join(f"action_{token_id}" for token_id in range(len(rule_tokens)))
+    labels = ", ".join(repr(token) for token, _ in rule_tokens)
+    return "\n\n".join(functions) + EXECUTE_ACTION.format(names=names, labels=labels)
+
+
+def char_test(chars, negated=False):
+    # `in` on a constant string beats chained comparisons of str in CPython
+    if negated:
+        return f"c not in {chars!r}" if chars else "True"
+    if len(chars) == 1:
+        return f"c == {chars[0]!r}"
+    return f"c in {''.join(sorted(chars))!r}"
+
+
+def state_code(table, state):
+    # Transitions of one state: its self-loop runs as a tight inner loop, the
+    # other targets follow, the one with the most characters first and the
+    # ones given by the characters they leave out last
+    classes_of = {}
+    row = state * table.width
+    for class_id in range(table.width):
+        target = table.transitions[row + class_id]
+        if target != DEAD:
+            classes_of.setdefault(target, set()).add(class_id)
+    targets = {}
+    for target, class_ids in classes_of.items():
+        chars, negated = table.char_set(class_ids)
+        if chars or negated:
+            targets[target] = chars, negated
+    if not targets:
+        return "break\n"
+
+    code, keyword = "", "if"
+    loop = targets.pop(state, None)
+    if loop:
+        test = char_test(*loop)
+        code += f"if {test}:\n    i += 1\n    while i < length:\n"
+        code += f"        c = data[i]\n        if not ({test}):\n            break\n"
+        code += "        i += 1\n"
+        if table.accept[state] != DEAD:
+            code += "    last_accept_position = i\n"
+            code += f"    last_accept_token = {table.accept[state]}\n"
+        code += "    continue\n"
+        keyword = "elif"
+
+    order = sorted(targets.items(), key=lambda item: (item[1][1], -len(item[1][0])))
+    for target, (chars, negated) in order:
+        code += f"{keyword} {char_test(chars, negated)}:\n    state = {target}\n"
+        if table.accept[target] != DEAD:
+            code += "    last_accept_position = i + 1\n"
+            code += f"    last_accept_token = {table.accept[target]}\n"
+        keyword = "elif"
+    return code + "else:\n    break\n"
+
+
+def dispatch_code(table, states):
+    # Binary search over the state number, then the state's own code
+    if len(states) == 1:
+        return state_code(table, states[0])
+    middle = len(states) // 2
+    return (
+        f"if state < {states[middle]}:\n"
+        + indent(dispatch_code(table, states[:middle]), "    ")
+        + "else:\n"
+        + indent(dispatch_code(table, states[middle:]), "    ")
+    )
+
+
+def generate_scanner(table):
+    """
+    Source of a direct-coded `scan(data)` for a TransitionTable: every DFA
+    state becomes its own block of character comparisons on local variables,
+    with no table, dict or pickle at run time. It yields the same
+    `(token_id, start, end)` stream as automata.scanner.scan.
+    """
+    # Every token starts in the initial state, so it is tested first
+    others = [state for state in range(table.size) if state != table.initial]
+    body = f"if state == {table.initial}:\n"
+    body += indent(state_code(table, table.initial), "    ")
+    if others:
+        body += "else:\n" + indent(dispatch_code(table, others), "    ")
+
+    keywords, lookup = "", ""
+    if table.keywords:
+        keywords = f"    keywords = {table.keywords!r}\n"
+        lookup = (
+            f"            if last_accept_token in {set(table.keyword_rules)!r}:\n"
+            "                last_accept_token = keywords.get(\n"
+            "                    data[start:last_accept_position], last_accept_token\n"
+            "                )\n"
+        )
+    starts, negated = start_chars(table)
+    return f"""import re
+
+
+def scan(data):
+{keywords}    search = re.compile({class_pattern(starts, negated)!r}).search
+    length = len(data)
+    start = 0
+    while start < length:
+        state = {table.initial}
+        last_accept_position = start
+        last_accept_token = {DEAD}
+        i = start
+
+        while i < length:
+            c = data[i]
+{indent(body, " " * 12)}            i += 1
+
+        if last_accept_token != {DEAD}:
+{lookup}            yield last_accept_token, start, last_accept_position
+            start = last_accept_position
+        else:
+            end = start + 1
+            if data[start] {"in" if negated else "not in"} {starts!r}:
+                match = search(data, end)
+                end = match.start() if match else length
+            yield {DEAD}, start, end
+            start = end
+"""
@@ -1,6 +1,8 @@
-from automata.render import create_direct_dfa_graph
+import gc
+from collections import deque
 
-R_END = "※"
+from automata.Regex import R_END
+from automata.render import create_direct_dfa_graph
 
 
 class DirectDFAState:
@@ -25,6 +27,7 @@ class DirectDFAState:
         self.accept_pos = accept_pos
         self.action = None
         self.label = None
+        self.token_id = None
 
 
 class DirectDFA:
@@ -33,215 +36,200 @@ class DirectDFA:
         self.initial_state = None
         self.final_states = set()
         self.state_counter = 0
+        self.classes = [[]]
+        self.class_of = {}
+        self.end_positions = []
 
     def generate_direct_dfa(self, syntax_tree, root):
-        followPosTable, posTable = syntax_tree.followPosTable, syntax_tree.posTable
-
-        initial_state = DirectDFAState(
-            state=root.firstPos,
-            state_id=self.state_counter,
-            initial=True,
-            subset=root.firstPos,
+        # Transitions are built per character class, not per character.
+        # States are keyed by their frozenset of positions, and the targets
+        # of all classes come out of one pass over a state's positions. A
+        # position of a character set belongs to every class it overlaps
+        followPosTable, posTable = (
+            syntax_tree.followPosTable,
+            syntax_tree.classPosTable,
         )
-        self.initial_state, self.states, self.state_counter = (
-            initial_state,
-            [initial_state],
-            self.state_counter + 1,
-        )
-
-        for pos in initial_state.state:
-            if pos in posTable[R_END]:
-                initial_state.accepting, initial_state.accept_pos = True, pos
-                self.final_states.add(initial_state)
-
-        alphabet = syntax_tree.operands
-
-        counter, new_states, first_iteration = 0, 0, False
-
-        while counter != new_states or not first_iteration:
-
-            first_iteration, counter = True, counter + (new_states != 0)
-
-            for symbol in alphabet:
-                change = True
-                subset = set()
-
-                for pos in self.states[counter].state:
-                    if pos in posTable[symbol]:
-                        subset = subset.union(followPosTable[pos])
-
-                # Check if the new state is already created
-                for state in self.states:
-                    if state.state == subset:
-                        self.states[counter].transitions[symbol] = state
-
-                        self.states[counter].transitions_ids[symbol] = state.state_id
-
-                        change = False
-                        break
-
-                if change and len(subset) > 0:
-                    new_state = DirectDFAState(
-                        state=subset, subset=subset, state_id=self.state_counter
-                    )
-                    self.states[counter].transitions_ids[symbol] = self.state_counter
-
-                    self.state_counter += 1
-
-                    for pos in new_state.state:
-                        if pos in posTable[R_END]:
-                            new_state.accepting = True
-                            new_state.accept_pos = pos
-                            self.final_states.add(new_state)
-                            break
-
-                    self.states[counter].transitions[symbol] = new_state
-
-                    self.states.append(new_state)
-                    new_states += 1
+        end_positions = syntax_tree.posTable[R_END]
+        self.classes, self.class_of = syntax_tree.classes, syntax_tree.classOf
+        self.end_positions = sorted(end_positions)
+
+        end_class = self.class_of.get(R_END)
+        classes_of_position = {}
+        for class_id, positions in posTable.items():
+            if class_id != end_class:
+                for pos in positions:
+                    classes_of_position.setdefault(pos, []).append(class_id)
+
+        ids, worklist = {}, deque()
+
+        def add_state(positions, initial=False):
+            state = DirectDFAState(
+                state=positions,
+                subset=positions,
+                state_id=self.state_counter,
+                initial=initial,
+            )
+            # The lowest end marker belongs to the rule listed first in the spec
+            accepted = positions & end_positions
+            if accepted:
+                state.accepting, state.accept_pos = True, min(accepted)
+                self.final_states.add(state)
+            ids[positions] = state
+            self.states.append(state)
+            self.state_counter += 1
+            worklist.append(state)
+            return state
+
+        # Every state built here lives as long as the DFA, so the cyclic
+        # collector would only rescan them over and over
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self.initial_state = add_state(frozenset(root.firstPos), initial=True)
+            while worklist:
+                state = worklist.popleft()
+                targets = {}
+                for pos in state.state:
+                    for class_id in classes_of_position.get(pos, ()):
+                        if class_id in targets:
+                            targets[class_id] |= followPosTable[pos]
+                        else:
+                            targets[class_id] = set(followPosTable[pos])
+
+                for symbol in sorted(targets):
+                    if not targets[symbol]:
+                        continue
+                    positions = frozenset(targets[symbol])
+                    target = ids.get(positions) or add_state(positions)
+                    state.transitions[symbol] = target
+                    state.transitions_ids[symbol] = target.state_id
+        finally:
+            if enabled:
+                gc.enable()
 
         return self
 
-    def get_state(self, positions):
-        for state in self.states:
-            if state.state == positions:
-                return state
-        new_state = DirectDFAState(positions)
-        return new_state
-
     def set_actions(self, rule_tokens):
-        acceptance_positions = [
-            state.accept_pos for state in self.states if state.accepting
-        ]
-        sorted_acceptance_positions = sorted(list(set(acceptance_positions)))
-
+        # Rules are numbered by their end marker, including the ones that are
+        # never reached, so a shadowed rule does not shift the others
         for state in self.states:
             if state.accept_pos is not None:
-                token, action = rule_tokens[
-                    sorted_acceptance_positions.index(state.accept_pos)
-                ]
+                token_id = self.end_positions.index(state.accept_pos)
+                token, action = rule_tokens[token_id]
                 state.action = action
                 state.label = token
+                state.token_id = token_id
 
     def render(self):
         create_direct_dfa_graph(self, False)
 
     def minimize(self):
-        # Step 1: Remove unreachable states
-        reachable_states = self.get_reachable_states()
-        self.states = [state for state in self.states if state in reachable_states]
-
-        # Step 2: Mark all states as unmarked
-        for state in self.states:
-            state.marked = False
-
-        # Step 3: Mark all accepting states
-        for state in self.states:
-            if state.accepting:
-                state.marked = True
-
-        # Step 4: Mark all states that have transitions to marked states
-        marked_states = [state for state in self.states if state.marked]
-
-        while True:
-            for state in self.states:
-                if state not in marked_states:
-                    for symbol, next_state in state.transitions.items():
-                        if next_state in marked_states:
-                            state.marked = True
-                            marked_states.append(state)
-                            break
-            if len(marked_states) == len(self.states):
-                break
-
-        # Step 5: Split the states into two groups: marked and unmarked
-        marked_states = [state for state in self.states if state.marked]
-        unmarked_states = [state for state in self.states if not state.marked]
-
-        # Step 6: Repeat until no more states can be split
-
-        while True:
-            split = False
-            for state in self.states:
-                if state not in marked_states and state not in unmarked_states:
-                    for marked_state in marked_states:
-                        if self.can_split(
-                            state, marked_state, marked_states, unmarked_states
-                        ):
-                            split = True
-                            break
-                    if split:
-                        break
-            if not split:
-                break
-
-        # Step 7: Combine the states
-        new_states = []
-        for state in marked_states:
-            new_state = DirectDFAState(
-                state.state,
-                marked=state.marked,
-                accepting=state.accepting,
-                initial=state.initial,
-                accept_pos=state.accept_pos,
-            )
-            new_state.action = state.action
-            new_state.label = state.label
-            new_states.append(new_state)
-
-        for state in unmarked_states:
-            new_state = DirectDFAState(
-                state.state,
-                marked=state.marked,
-                accepting=state.accepting,
-                initial=state.initial,
-                accept_pos=state.accept_pos,
+        """
+        Hopcroft's partition refinement, O(n log n) in the number of states.
+
+        Accepting states start in one block per end marker, so states of
+        different rules are never merged, and the non-accepting states share
+        a block with an implicit dead state. Blocks are split by the states
+        that reach a splitter block on some class; of the two halves of a
+        split, only the smaller one has to be queued again. The block of the
+        dead state is dropped, so states that can never accept become DEAD
+        transitions.
+        """
+        states = self.states
+        dead = len(states)
+        index = {state: i for i, state in enumerate(states)}
+        alphabet = sorted({symbol for state in states for symbol in state.transitions})
+
+        # Incoming (class, source) transitions of every state; the dead
+        # state takes the missing ones and loops on every class
+        incoming = [[] for _ in range(dead + 1)]
+        for i, state in enumerate(states + [None]):
+            transitions = state.transitions if state is not None else {}
+            for symbol in alphabet:
+                target = transitions.get(symbol)
+                incoming[dead if target is None else index[target]].append((symbol, i))
+
+        groups = {}
+        for i, state in enumerate(states):
+            accept_pos = state.accept_pos if state.accepting else None
+            groups.setdefault(accept_pos, []).append(i)
+        groups.setdefault(None, []).append(dead)
+
+        blocks = [set(members) for members in groups.values()]
+        block_of = [0] * (dead + 1)
+        for block_id, members in enumerate(blocks):
+            for i in members:
+                block_of[i] = block_id
+        # Splitting by every block but one is enough; leave out the largest
+        largest = max(range(len(blocks)), key=lambda block_id: len(blocks[block_id]))
+        worklist = [block_id for block_id in range(len(blocks)) if block_id != largest]
+        queued = set(worklist)
+
+        while worklist:
+            splitter = worklist.pop()
+            queued.discard(splitter)
+            predecessors = {}
+            for target in list(blocks[splitter]):
+                for symbol, source in incoming[target]:
+                    predecessors.setdefault(symbol, []).append(source)
+
+            for symbol in sorted(predecessors):
+                touched = {}
+                for source in predecessors[symbol]:
+                    touched.setdefault(block_of[source], []).append(source)
+
+                for block_id, inside in touched.items():
+                    block = blocks[block_id]
+                    if len(inside) == len(block):
+                        continue
+                    block.difference_update(inside)
+                    new_id = len(blocks)
+                    blocks.append(set(inside))
+                    for i in inside:
+                        block_of[i] = new_id
+                    if block_id in queued:
+                        smaller = new_id
+                    else:
+                        smaller = new_id if len(inside) <= len(block) else block_id
+                    queued.add(smaller)
+                    worklist.append(smaller)
+
+        # One state per block, numbered in the order of their first member
+        dead_block = block_of[dead]
+        representatives = {}
+        for i in range(dead):
+            if block_of[i] != dead_block:
+                representatives.setdefault(block_of[i], i)
+
+        merged = {}
+        for state_id, (block_id, i) in enumerate(representatives.items()):
+            old = states[i]
+            state = DirectDFAState(
+                state=old.state,
+                subset=old.subset,
+                state_id=state_id,
+                accepting=old.accepting,
+                initial=block_id == block_of[index[self.initial_state]],
+                accept_pos=old.accept_pos,
             )
-            new_state.action = state.action
-            new_state.label = state.label
-            new_states.append(new_state)
-
-        self.states = new_states
-
-        # Step 8: Update the transitions
-        for state in self.states:
-            for symbol, next_state in state.transitions.items():
-                state.transitions[symbol] = self.get_new_state(
-                    next_state, marked_states, unmarked_states
-                )
-
-        # Step 9: Update the initial state
-        self.initial_state = self.get_new_state(
-            self.initial_state, marked_states, unmarked_states
-        )
-
-        # Step 10: Update the final states
-        self.final_states = set(
-            [
-                self.get_new_state(state, marked_states, unmarked_states)
-                for state in self.final_states
-            ]
-        )
-
-    def can_split(self, state, marked_state, marked_states, unmarked_states):
-        for symbol, next_state in state.transitions.items():
-            if next_state in marked_states:
-                return True
-        return False
-
-    def get_new_state(self, old_state, marked_states, unmarked_states):
-        for state in marked_states + unmarked_states:
-            if state.state == old_state.state:
-                return state
-        return None
-
-    def get_reachable_states(self):
-        reachable_states = set()
-        stack = [self.initial_state]
-        while stack:
-            current_state = stack.pop()
-            reachable_states.add(current_state)
-            for symbol, next_state in current_state.transitions.items():
-                if next_state not in reachable_states:
-                    stack.append(next_state)
-        return reachable_states
+            state.action, state.label = old.action, old.label
+            state.token_id = old.token_id
+            merged[block_id] = state
+
+        for block_id, i in representatives.items():
+            state = merged[block_id]
+            for symbol, target in states[i].transitions.items():
+                target_block = block_of[index[target]]
+                if target_block != dead_block:
+                    state.transitions[symbol] = merged[target_block]
+                    state.transitions_ids[symbol] = merged[target_block].state_id
+
+        self.states = list(merged.values())
+        self.initial_state = merged.get(block_of[index[self.initial_state]])
+        if self.initial_state is None:
+            # Nothing is ever accepted: keep a lone initial state
+            self.initial_state = DirectDFAState(state=set(), state_id=0, initial=True)
+            self.states = [self.initial_state]
+        self.final_states = {state for state in self.states if state.accepting}
+        self.state_counter = len(self.states)
+        return self
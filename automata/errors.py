@@ -0,0 +1,54 @@
+import json
+
+PREVIEW = 32  # characters of the offending text kept in a record
+
+
+class ErrorSink:
+    """
+    Receives the lexical errors of a scan and writes them as JSON lines
+    instead of printing them, one record per run of invalid input with its
+    span, the beginning of its text and, when a LineIndex is given, its line
+    and column. Error tokens that touch are merged, so a character whose
+    walk failed followed by a run of invalid input is still one record.
+    """
+
+    def __init__(self, file_path, lines=None):
+        self.file = open(file_path, "w")
+        self.lines = lines
+        self.count = 0
+        self.pending = None
+
+    def report(self, start, end, text):
+        pending = self.pending
+        if pending is not None and pending[1] == start:
+            pending[1] = end
+            if len(pending[2]) < PREVIEW:
+                pending[2] = (pending[2] + text)[:PREVIEW]
+            return
+        self.flush()
+        self.pending = [start, end, text[:PREVIEW]]
+
+    def flush(self):
+        if self.pending is None:
+            return
+        start, end, text = self.pending
+        if isinstance(text, bytes):
+            text = text.decode("latin-1")
+        record = {"start": start, "end": end, "text": text}
+        if self.lines is not None:
+            record["line"], record["column"] = self.lines.position(start)
+        self.file.write(json.dumps(record) + "\n")
+        self.count += 1
+        self.pending = None
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,146 @@
+from automata.scanner import start_search
+from automata.table import DEAD, OTHER
+
+
+def scan_from(table, data, start):
+    """
+    Same tokenization as automata.scanner.scan, starting at `start`. Yields
+    `(token_id, start, end, reach)` where `reach` is one past the last
+    character the longest-match walk looked at, counting the end of the input
+    as a character. A token only depends on `data[start:reach]`.
+    """
+    rows, column = table.rows(), table.columns.get
+    keywords, keyword_rules = table.keywords, table.keyword_rules
+    accept = table.width
+    initial = table.initial * (table.width + 1)
+    length = len(data)
+    search = None
+
+    while start < length:
+        state = initial
+        last_accept_position = start
+        last_accept_token = DEAD
+        i = start
+
+        while i < length:
+            state = rows[state + column(data[i], OTHER)]
+            if state == DEAD:
+                break
+            i += 1
+            if rows[state + accept] != DEAD:
+                last_accept_position = i
+                last_accept_token = rows[state + accept]
+
+        if last_accept_token != DEAD:
+            if last_accept_token in keyword_rules:
+                last_accept_token = keywords.get(
+                    data[start:last_accept_position], last_accept_token
+                )
+            yield last_accept_token, start, last_accept_position, i + 1
+            start = last_accept_position
+        else:
+            end, reach = start + 1, i + 1
+            if rows[initial + column(data[start], OTHER)] == DEAD:
+                # The run ends at a character that may start a token
+                search = search or start_search(table)
+                match = search(data, end)
+                end = match.start() if match else length
+                reach = end + 1
+            yield DEAD, start, end, reach
+            start = end
+
+
+class IncrementalLexer:
+    """
+    Keeps the tokens of a buffer up to date while it is edited.
+
+    The tokens live in a gap buffer placed at the last edit: `before` holds
+    the tokens in front of it with absolute offsets, `after` the ones behind
+    it in reverse order, with offsets counted from the end of the buffer so
+    they stay valid when an edit changes its length. An edit moves the gap,
+    drops the tokens whose walk reached the edited region and re-lexes from
+    there until a new token starts where an old one behind the edit did;
+    from that token on the old stream is reused. The work depends on the
+    distance between edits and the size of the damage, not on the size of
+    the buffer.
+    """
+
+    def __init__(self, table, text):
+        self.table = table
+        self.length = len(text)
+        self.before = []
+        self.after = []
+        self.lookahead = 1  # longest reach - end seen, bounds the walk back
+        for token in scan_from(table, text, 0):
+            self.before.append(token)
+            self.lookahead = max(self.lookahead, token[3] - token[2])
+
+    def __len__(self):
+        return len(self.before) + len(self.after)
+
+    def __iter__(self):
+        length = self.length
+        for token_id, start, end, _ in self.before:
+            yield token_id, start, end
+        for token_id, start, end, _ in reversed(self.after):
+            yield token_id, start + length, end + length
+
+    def edit(self, text, offset, deleted, inserted):
+        """
+        Applies the replacement of `deleted` characters at `offset` by
+        `inserted`. `text` is the whole buffer after the edit; only the
+        region that is re-lexed is read from it.
+
+        Returns `(first, removed, tokens)`: the old tokens from index `first`
+        to `first + removed` were replaced by the new `(token_id, start, end)`
+        `tokens`, and the ones after them moved by `len(inserted) - deleted`.
+        """
+        before, after = self.before, self.after
+        old_length, self.length = self.length, len(text)
+
+        # Move the gap to the edit, with the offsets of the old buffer
+        while after and after[-1][2] + old_length <= offset:
+            token_id, start, end, reach = after.pop()
+            before.append(
+                (token_id, start + old_length, end + old_length, reach + old_length)
+            )
+        while before and before[-1][2] > offset:
+            token_id, start, end, reach = before.pop()
+            after.append(
+                (token_id, start - old_length, end - old_length, reach - old_length)
+            )
+
+        # Tokens in front of the edit whose walk read into it are stale too
+        first = len(before)
+        j = first - 1
+        while j >= 0 and before[j][2] > offset - self.lookahead:
+            if before[j][3] > offset:
+                first = j
+            j -= 1
+        removed = len(before) - first
+        position = before[first][1] if removed else (before[-1][2] if before else 0)
+        del before[first:]
+
+        # Re-lex until a new token starts where an old one behind the edit did
+        unchanged = offset + len(inserted)
+        length = self.length
+        tokens = []
+        for token in scan_from(self.table, text, position):
+            token_start = token[1]
+            while after and after[-1][1] + length < token_start:
+                after.pop()
+                removed += 1
+            if (
+                after
+                and token_start >= unchanged
+                and after[-1][1] + length == token_start
+            ):
+                break
+            before.append(token)
+            tokens.append(token[:3])
+            self.lookahead = max(self.lookahead, token[3] - token[2])
+        else:
+            removed += len(after)
+            after.clear()
+
+        return first, removed, tokens
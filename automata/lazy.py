@@ -0,0 +1,183 @@
+import re
+
+from automata.directDfa import R_END
+from automata.Regex import Regex
+from automata.syntax_tree import SyntaxTree
+from automata.table import DEAD, OTHER, class_pattern, column_chars
+
+UNKNOWN = -2  # transition not built yet
+MAX_MEMORY = 8 << 20  # bytes of states kept before the cache is flushed
+STATE_OVERHEAD = 200  # rough bytes of a state besides its row and positions
+
+
+class LazyDFA:
+    """
+    DFA whose states are built from the followpos table of a SyntaxTree only
+    when the input reaches them, for specs whose full subset construction
+    is too large or too slow to build ahead of time.
+
+    States live in `rows` with the layout of TransitionTable.rows(): rows of
+    `width + 1` slots, targets premultiplied by that stride and the token id
+    in the last slot; a transition that was never taken holds UNKNOWN. The
+    states are a cache: once their estimated size passes `max_memory` bytes,
+    all of them are dropped and the walk goes on from the state it needed,
+    like RE2 does. `flushes` counts how often that happened; a count that
+    keeps growing means the budget is too small for the input.
+    """
+
+    def __init__(self, tree, keywords=None, max_memory=MAX_MEMORY):
+        self.followpos = tree.followPosTable
+        end_positions = sorted(tree.posTable.get(R_END, ()))
+        self.token_of = {pos: token_id for token_id, pos in enumerate(end_positions)}
+        self.width = len(tree.classes)
+        self.columns = {
+            char: class_id for char, class_id in tree.classOf.items() if len(char) == 1
+        }
+
+        # A position of a character set is in every class it overlaps
+        end_class = tree.classOf.get(R_END)
+        classes_of = {}
+        for class_id, positions in tree.classPosTable.items():
+            if class_id != end_class:
+                for pos in positions:
+                    classes_of.setdefault(pos, set()).add(class_id)
+        self.classes_of = classes_of
+        self.first = frozenset(tree.root.firstPos) if tree.root else frozenset()
+
+        self.max_memory = max_memory
+        self.flushes = 0
+        self.rows = []
+        self.flush()
+        self.flushes = 0
+
+        self.keywords = dict(keywords or {})
+        self.keyword_rules = frozenset(self.match(lexeme) for lexeme in self.keywords)
+
+    @classmethod
+    def from_regex(cls, final_regex, keywords=None, max_memory=MAX_MEMORY):
+        # From the joined regex of Yalex, with its end markers
+        return cls(SyntaxTree(Regex(final_regex).shunting_yard()), keywords, max_memory)
+
+    def __len__(self):
+        return len(self.sets)
+
+    def flush(self):
+        # Drops every state; the initial one is built again at offset 0
+        self.rows.clear()
+        self.ids = {}
+        self.sets = []
+        self.memory = 0
+        self.flushes += 1
+        self.add(self.first)
+
+    def add(self, positions):
+        stride = self.width + 1
+        offset = len(self.rows)
+        accepted = [self.token_of[pos] for pos in positions if pos in self.token_of]
+        self.rows.extend([UNKNOWN] * self.width)
+        self.rows.append(min(accepted) if accepted else DEAD)
+        self.ids[positions] = offset
+        self.sets.append(positions)
+        self.memory += stride * 8 + len(positions) * 8 + STATE_OVERHEAD
+        return offset
+
+    def step(self, state, class_id):
+        """
+        Builds the transition of the state at offset `state` on `class_id`
+        and returns the offset of its target, or DEAD. Adding the target may
+        flush the cache, so every offset but the returned one and the
+        initial state's 0 is stale afterwards.
+        """
+        stride = self.width + 1
+        followpos, classes_of = self.followpos, self.classes_of
+        target = set()
+        for pos in self.sets[state // stride]:
+            if class_id in classes_of.get(pos, ()):
+                target |= followpos[pos]
+        if not target:
+            self.rows[state + class_id] = DEAD
+            return DEAD
+
+        target = frozenset(target)
+        offset = self.ids.get(target)
+        if offset is None:
+            if self.memory >= self.max_memory:
+                self.flush()
+                offset = self.ids.get(target)
+                return self.add(target) if offset is None else offset
+            offset = self.add(target)
+        self.rows[state + class_id] = offset
+        return offset
+
+    def match(self, lexeme):
+        # Token id the automaton gives to the whole of `lexeme`
+        rows, state = self.rows, 0
+        for char in lexeme:
+            class_id = self.columns.get(char, OTHER)
+            target = rows[state + class_id]
+            if target == UNKNOWN:
+                target = self.step(state, class_id)
+            if target == DEAD:
+                return DEAD
+            state = target
+        return rows[state + self.width]
+
+    def start_search(self):
+        # Like automata.scanner.start_search, from the initial positions
+        starts = {
+            class_id for pos in self.first for class_id in self.classes_of.get(pos, ())
+        }
+        return re.compile(class_pattern(*column_chars(self.columns, starts))).search
+
+
+def scan_lazy(dfa, data):
+    """
+    Same tokenization as automata.scanner.scan over a LazyDFA, building the
+    states the input needs as it goes.
+    """
+    rows, column, step = dfa.rows, dfa.columns.get, dfa.step
+    keywords, keyword_rules = dfa.keywords, dfa.keyword_rules
+    accept = dfa.width
+    search = None
+    length = len(data)
+
+    start = 0
+    while start < length:
+        state = 0
+        last_accept_position = start
+        last_accept_token = DEAD
+        i = start
+
+        while i < length:
+            class_id = column(data[i], OTHER)
+            target = rows[state + class_id]
+            if target == UNKNOWN:
+                target = step(state, class_id)
+            if target == DEAD:
+                break
+            state = target
+            i += 1
+            if rows[state + accept] != DEAD:
+                last_accept_position = i
+                last_accept_token = rows[state + accept]
+
+        if last_accept_token != DEAD:
+            if last_accept_token in keyword_rules:
+                last_accept_token = keywords.get(
+                    data[start:last_accept_position], last_accept_token
+                )
+            yield last_accept_token, start, last_accept_position
+            start = last_accept_position
+        else:
+            end = start + 1
+            class_id = column(data[start], OTHER)
+            target = rows[class_id]
+            if target == UNKNOWN:
+                target = step(0, class_id)
+            if target == DEAD:
+                # No token starts with this character: skip the whole run
+                search = search or dfa.start_search()
+                match = search(data, end)
+                end = match.start() if match else length
+            yield DEAD, start, end
+            start = end
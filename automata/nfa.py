@@ -39,6 +39,7 @@ class NFA:
         self.initial_state = initial_state
         self.final_state = final_state
         self.states = self.get_all_states(initial_state)
+        self.compiled = None
 
     def get_all_states(
         self, initial_state: State, visited: set[State] = None
@@ -59,35 +60,94 @@ class NFA:
             if transition.input != "ϵ"  # Exclude epsilon transitions
         )
 
+    def compile(self) -> "CompiledNFA":
+        # Built on the first call, once the automaton is complete (the final
+        # state is only marked accepting after construction), then reused
+        if self.compiled is None:
+            self.compiled = CompiledNFA(self)
+        return self.compiled
+
     def run(self, input_string: str) -> bool:
-        current_states = self.initial_state.epsilon_closure()
-
-        # print(f"Initial states: {[state.id for state in current_states]}")
-        # print(
-        #     f"Accepting states: {[state.id for state in self.states if state.is_accepting]}"
-        # )
-
-        for character in input_string:
-            # print set of current states ids
-            # print(f"Current states: {[state.id for state in current_states]}")
-            # print(f"Reading: {character}")
-
-            next_states = set()
-            for state in current_states:
-                for transition in state.transitions:
-                    if transition.input == character:
-                        next_states = next_states.union(
-                            transition.new_state.epsilon_closure()
-                        )
-            current_states = next_states
-
-        # Check if any of the current states is an accepting state
-        # if any(state.is_accepting for state in current_states):
-        #     return "Accepted"
-        
-        if any(state.is_accepting for state in current_states):
-            print(f'NFA simulation: {True}')
-        else:
-            print(f'NFA simulation: {False}')
+        accepted = self.compile().match(input_string)
+        print(f"NFA simulation: {accepted}")
 
         return "Rejected"
+
+
+class CompiledNFA:
+    """
+    An NFA flattened into integer arrays for simulation. States are numbered
+    0..n-1 and input symbols 0..k-1; `transitions[state]` lists the
+    `(symbol, target)` pairs of the state's non-epsilon transitions.
+
+    Epsilon closures are computed once, here. They only keep the states that
+    matter to the simulation, those with a transition to take or that
+    accept, so a step is one pass over the active states and the closures
+    of their targets. The active states live in a sparse set: a dense list of
+    members plus a `sparse` array of their indices in it, which tests
+    membership in O(1) and is cleared by emptying the list.
+    """
+
+    def __init__(self, nfa: NFA):
+        order = sorted(nfa.states, key=lambda state: state.id)
+        index = {state: i for i, state in enumerate(order)}
+        self.size = len(order)
+        self.symbols = {
+            symbol: i for i, symbol in enumerate(sorted(nfa.input_symbols()))
+        }
+        self.transitions = [
+            [
+                (self.symbols[transition.input], index[transition.new_state])
+                for transition in state.transitions
+                if transition.input != "ϵ"
+            ]
+            for state in order
+        ]
+        self.accepting = [state.is_accepting for state in order]
+        self.closures = [
+            tuple(
+                sorted(
+                    index[member]
+                    for member in state.epsilon_closure()
+                    if member.is_accepting or self.transitions[index[member]]
+                )
+            )
+            for state in order
+        ]
+        self.initial = index[nfa.initial_state]
+
+    def match(self, input_string: str) -> bool:
+        return self.match_many([input_string])[0]
+
+    def match_many(self, input_strings) -> List[bool]:
+        # Whether the NFA accepts each of the strings, in order. The sparse
+        # array is shared by every string and never needs clearing
+        transitions, closures = self.transitions, self.closures
+        symbols, accepting = self.symbols, self.accepting
+        sparse = [0] * self.size
+        results = []
+
+        for input_string in input_strings:
+            current = list(closures[self.initial])
+            for character in input_string:
+                symbol = symbols.get(character)
+                if symbol is None:
+                    current = []
+                    break
+                following = []
+                for state in current:
+                    for transition_symbol, target in transitions[state]:
+                        if transition_symbol != symbol:
+                            continue
+                        for member in closures[target]:
+                            i = sparse[member]
+                            if i < len(following) and following[i] == member:
+                                continue
+                            sparse[member] = len(following)
+                            following.append(member)
+                current = following
+                if not current:
+                    break
+            results.append(any(accepting[state] for state in current))
+
+        return results
@@ -0,0 +1,122 @@
+import os
+import re
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from itertools import repeat
+
+from automata.scanner import open_mapped, scan_bytes
+from automata.table import DEAD, OTHER
+
+MIN_REGION = 1 << 20  # smaller inputs are not worth a process pool
+
+
+def delimiter_bytes(table):
+    """
+    Bytes of the classes that behave like a `ws = delim+` rule: from the
+    initial state they reach an accepting state that loops on that class
+    and nothing else. The end of a run of them is where a new token usually
+    starts.
+    """
+
+    def only_on(state, class_id):
+        row = table.transitions[state * table.width : (state + 1) * table.width]
+        return all(target == DEAD for c, target in enumerate(row) if c != class_id)
+
+    delimiters = []
+    for code in range(256):
+        class_id = table.class_map[code]
+        if class_id == OTHER:
+            continue
+        first = table.transitions[table.initial * table.width + class_id]
+        if first == DEAD or table.accept[first] == DEAD or not only_on(first, class_id):
+            continue
+        loop = table.transitions[first * table.width + class_id]
+        if (
+            loop != DEAD
+            and table.transitions[loop * table.width + class_id] == loop
+            and only_on(loop, class_id)
+        ):
+            delimiters.append(code)
+    return bytes(delimiters)
+
+
+def region_starts(table, data, regions):
+    """
+    Splits `data` into `regions` parts, moving every cut forward to the end of
+    the next run of delimiters. The cuts are only a guess of where tokens
+    start; the merge re-lexes the seams where the guess was wrong.
+    """
+    length = len(data)
+    delimiters = delimiter_bytes(table)
+    runs = re.compile(b"[" + re.escape(delimiters) + b"]+") if delimiters else None
+
+    starts = [0]
+    for k in range(1, regions):
+        cut = max(length * k // regions, starts[-1])
+        if runs is not None:
+            match = runs.search(data, cut)
+            cut = match.end() if match else length
+        if cut < length and cut > starts[-1]:
+            starts.append(cut)
+    return starts
+
+
+def _scan_region(table, file_path, start, stop):
+    # Runs in a worker: lex speculatively as if a token started at `start`
+    tokens, starts, ends = array("i"), array("q"), array("q")
+    with open_mapped(file_path) as data:
+        for token_id, token_start, token_end in scan_bytes(table, data, start, stop):
+            tokens.append(token_id)
+            starts.append(token_start)
+            ends.append(token_end)
+    return tokens, starts, ends
+
+
+def scan_parallel(table, file_path, workers=None):
+    """
+    Tokenizes a file over several processes and yields the same
+    `(token_id, start, end)` stream as `scan_bytes` on the whole file.
+
+    Every region is lexed speculatively from its start. While merging, a
+    region is spliced in at the first of its tokens that begins where the
+    previous region's last token ended; before that, the seam is re-lexed
+    sequentially. Lexing from the same token start always gives the same
+    tokens, so the result is identical to the sequential scanner's.
+    """
+    workers = workers or os.cpu_count() or 1
+    with open_mapped(file_path) as data:
+        length = len(data)
+        if workers == 1 or length < MIN_REGION:
+            yield from scan_bytes(table, data)
+            return
+
+        starts = region_starts(table, data, workers)
+        stops = starts[1:] + [length]
+
+        with ProcessPoolExecutor(workers) as pool:
+            results = pool.map(
+                _scan_region, repeat(table), repeat(file_path), starts, stops
+            )
+
+            position = 0
+            for (tokens, token_starts, token_ends), stop in zip(results, stops):
+                index = bisect_left(token_starts, position)
+                if index == len(token_starts) or token_starts[index] != position:
+                    # Mis-speculated seam: re-lex until both streams meet
+                    with closing(scan_bytes(table, data, position, stop)) as relexed:
+                        for token in relexed:
+                            yield token
+                            position = token[2]
+                            index = bisect_left(token_starts, position, index)
+                            if (
+                                index < len(token_starts)
+                                and token_starts[index] == position
+                            ):
+                                break
+
+                for i in range(index, len(token_starts)):
+                    yield tokens[i], token_starts[i], token_ends[i]
+                if index < len(token_starts):
+                    position = token_ends[-1]
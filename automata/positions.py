@@ -0,0 +1,75 @@
+from array import array
+from bisect import bisect_right
+
+from automata.scanner import CHUNK_SIZE
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def line_starts(data, base=0):
+    """
+    Offsets right after every newline of `data`, shifted by `base`. Uses
+    NumPy on bytes-like input when it is installed, and the C loop of
+    str.find / bytes.find otherwise; both are one pass over the buffer.
+    """
+    if isinstance(data, str):
+        newline = "\n"
+    elif numpy is not None:
+        found = numpy.flatnonzero(numpy.frombuffer(data, numpy.uint8) == 10)
+        starts = array("q")
+        starts.frombytes((found + (base + 1)).astype(numpy.int64).tobytes())
+        return starts
+    else:
+        newline = b"\n"
+
+    starts = array("q")
+    find = data.find
+    i = find(newline)
+    while i != -1:
+        starts.append(base + i + 1)
+        i = find(newline, i + 1)
+    return starts
+
+
+class LineIndex:
+    """
+    Turns scanner offsets into `(line, column)` pairs, both counted from 1.
+
+    The line starts are kept as one array of integers and built the first
+    time a position is asked for, so tokens stay plain offsets and scanning
+    never pays for diagnostics. A lookup is a binary search over that array.
+    """
+
+    def __init__(self, data=None, file_path=None, chunk_size=CHUNK_SIZE):
+        self.data = data
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self._starts = None
+
+    @classmethod
+    def from_file(cls, file_path, chunk_size=CHUNK_SIZE):
+        # The file is read in chunks, with offsets counted as scan_stream
+        # counts them, when the first position is asked for
+        return cls(file_path=file_path, chunk_size=chunk_size)
+
+    def starts(self):
+        if self._starts is None:
+            starts = array("q", [0])
+            if self.file_path is None:
+                starts.extend(line_starts(self.data))
+            else:
+                offset = 0
+                with open(self.file_path, "r") as file:
+                    for chunk in iter(lambda: file.read(self.chunk_size), ""):
+                        starts.extend(line_starts(chunk, offset))
+                        offset += len(chunk)
+            self._starts, self.data = starts, None
+        return self._starts
+
+    def position(self, offset):
+        starts = self.starts()
+        line = bisect_right(starts, offset)
+        return line, offset - starts[line - 1] + 1
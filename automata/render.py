@@ -1,6 +1,5 @@
 import re
 import string
-from curses.ascii import isspace
 
 import pydotplus
 
@@ -20,10 +19,10 @@ def add_edges(graph, node, parent_id=None):
         node_id = str(counter[0])
         counter[0] += 1
 
-        if isspace(node.value):
+        if isinstance(node.value, str) and node.value.isspace():
             node.value = re.sub(r"\s+", "ws", node.value)
 
-        graph.add_node(pydotplus.Node(node_id, label=node.value, shape="circle"))
+        graph.add_node(pydotplus.Node(node_id, label=str(node.value), shape="circle"))
         if parent_id is not None:
             graph.add_edge(pydotplus.Edge(parent_id, node_id))
         add_edges(graph, node.left, node_id)
@@ -99,6 +98,22 @@ def create_graph(root):
 #     graph.write_pdf(pdf_file_path)  # Save PDF file
 
 
+def class_label(symbols):
+    # Collapse runs of consecutive characters into ranges, e.g. "a-z0-9"
+    chars = sorted(symbol for symbol in symbols if len(symbol) == 1)
+    parts, i = [], 0
+    while i < len(chars):
+        j = i
+        while j + 1 < len(chars) and ord(chars[j + 1]) == ord(chars[j]) + 1:
+            j += 1
+        parts.append(chars[i] if j - i < 2 else f"{chars[i]}-{chars[j]}")
+        if j - i == 1:
+            parts.append(chars[j])
+        i = j + 1
+    parts.extend(symbol for symbol in symbols if len(symbol) != 1)
+    return repr("".join(parts))[1:-1]
+
+
 def create_direct_dfa_graph(dfa, minimized=False):
     # Create a DOT format representation of the DFA
     dot = pydotplus.Dot()
@@ -131,7 +146,7 @@ def create_direct_dfa_graph(dfa, minimized=False):
             edge = pydotplus.Edge(
                 state_nodes[state.state_id],
                 state_nodes[next_state_id],
-                label=symbol,
+                label=class_label(dfa.classes[symbol]) if symbol else "other",
                 color=edge_color,
             )
             dot.add_edge(edge)
@@ -0,0 +1,122 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from automata.directDfa import DirectDFA, DirectDFAState
+from automata.Regex import Regex
+from automata.syntax_tree import SyntaxTree
+from automata.table import DEAD, OTHER, TransitionTable
+
+MIN_RULES = 16  # fewer rules to build are not worth a process pool
+
+
+def compile_rule(regex):
+    # Minimized table of one rule on its own, accepting with token id 0
+    tree = SyntaxTree(Regex("(" + regex + "※)").shunting_yard())
+    dfa = DirectDFA().generate_direct_dfa(tree, tree.root)
+    dfa.set_actions([(regex, None)])
+    dfa.minimize()
+    return TransitionTable(dfa, [(regex, None)])
+
+
+def compile_rules(regexes, cache=None, workers=None):
+    """
+    Tables of every rule in `regexes`, each built on its own. The rules are
+    spread over a process pool when there are enough of them. With a
+    LexerCache, every rule is stored under the hash of its regex, so after an
+    edit only the rules that changed are built again.
+    """
+    tables = [None] * len(regexes)
+    keys = [cache.content_key(regex, "rule") for regex in regexes] if cache else []
+    for index, key in enumerate(keys):
+        tables[index] = cache.get(key)
+
+    missing = [index for index, table in enumerate(tables) if table is None]
+    sources = [regexes[index] for index in missing]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(missing) < MIN_RULES:
+        built = map(compile_rule, sources)
+    else:
+        # Forked workers do not import the calling script again, which for a
+        # top-level script like lexer.py would run it once per worker
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            chunk = max(1, len(sources) // (4 * workers))
+            built = list(pool.map(compile_rule, sources, chunksize=chunk))
+
+    for index, table in zip(missing, built):
+        tables[index] = table
+        if cache:
+            cache.store(keys[index], table)
+    if cache and missing:
+        cache.evict()
+    return tables
+
+
+def combine_rules(tables):
+    """
+    Tokenizer DFA of the rules whose tables are given in priority order, as
+    a DirectDFA ready for `set_actions` and `minimize`.
+
+    It is the product of the rule automata: a state is the tuple of
+    `(rule, state)` pairs of the rules still alive, and it accepts for the
+    first of them that accepts, like the lowest end marker of the joined
+    regex. The columns are the common refinement of the rules' own classes,
+    so a character is in class 0 when every rule leaves it there.
+    """
+    signatures = {}
+    for char in sorted({char for table in tables for char in table.columns}):
+        signature = tuple(table.columns.get(char, OTHER) for table in tables)
+        signatures.setdefault(signature, []).append(char)
+
+    other = (OTHER,) * len(tables)
+    listed = sorted(
+        (chars, signature)
+        for signature, chars in signatures.items()
+        if signature != other
+    )
+    columns = [other] + [signature for _, signature in listed]
+
+    dfa = DirectDFA()
+    dfa.classes = [[]] + [chars for chars, _ in listed]
+    dfa.class_of = {
+        char: class_id for class_id, chars in enumerate(dfa.classes) for char in chars
+    }
+    dfa.end_positions = list(range(len(tables)))
+
+    ids, worklist = {}, deque()
+
+    def add_state(live, initial=False):
+        state = DirectDFAState(state=live, state_id=len(dfa.states), initial=initial)
+        for rule, rule_state in live:
+            if tables[rule].accept[rule_state] != DEAD:
+                state.accepting, state.accept_pos = True, rule
+                dfa.final_states.add(state)
+                break
+        ids[live] = state
+        dfa.states.append(state)
+        worklist.append(state)
+        return state
+
+    dfa.initial_state = add_state(
+        tuple((rule, table.initial) for rule, table in enumerate(tables)), initial=True
+    )
+    while worklist:
+        state = worklist.popleft()
+        for class_id, column in enumerate(columns):
+            live = []
+            for rule, rule_state in state.state:
+                table = tables[rule]
+                target = table.transitions[rule_state * table.width + column[rule]]
+                if target != DEAD:
+                    live.append((rule, target))
+            if live:
+                live = tuple(live)
+                target = ids.get(live) or add_state(live)
+                state.transitions[class_id] = target
+                state.transitions_ids[class_id] = target.state_id
+
+    dfa.state_counter = len(dfa.states)
+    return dfa
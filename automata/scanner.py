@@ -0,0 +1,432 @@
+import mmap
+import os
+import re
+from contextlib import contextmanager
+
+from automata.table import DEAD, OTHER, class_pattern
+
+CHUNK_SIZE = 1 << 16
+
+
+def start_chars(table, binary=False):
+    # Characters with a transition out of the initial state, as
+    # `(chars, negated)` like TransitionTable.char_set
+    row = table.initial * table.width
+    return table.char_set(
+        {
+            class_id
+            for class_id in range(table.width)
+            if table.transitions[row + class_id] != DEAD
+        },
+        binary,
+    )
+
+
+def start_search(table, binary=False):
+    """
+    `search` of a pattern matching any character that can start a token, to
+    find the end of a run of characters that cannot. With `binary`, the
+    pattern is over bytes read as Latin-1, like `scan_bytes` reads them.
+    """
+    pattern = class_pattern(*start_chars(table, binary))
+    if binary:
+        return re.compile(pattern.encode("latin-1")).search
+    return re.compile(pattern).search
+
+
+def scan(table, data):
+    """
+    Longest-match tokenization of `data` over a TransitionTable.
+
+    Yields `(token_id, start, end)` for every recognized lexeme, and
+    `(DEAD, start, end)` for input that is not one: a whole run of characters
+    that no token starts with, or a single character whose walk never
+    reached an accepting state.
+    """
+    # On str input a dict lookup beats ord() plus indexing table.class_map
+    rows, column = table.rows(), table.columns.get
+    loops = table.self_loops()
+    keywords, keyword_rules = table.keywords, table.keyword_rules
+    accept = table.width  # offset of the accept slot inside a row
+    initial = table.initial * (table.width + 1)
+    search = None  # built on the first error
+    length = len(data)
+
+    start = 0
+    while start < length:
+        state = initial
+        last_accept_position = start
+        last_accept_token = DEAD
+        i = start
+
+        while i < length:
+            target = rows[state + column(data[i], OTHER)]
+            if target == DEAD:
+                break
+            i += 1
+            if target == state and i < length:
+                # Looping twice in a row: cross the rest of the run in one call
+                if rows[state + column(data[i], OTHER)] == state:
+                    i = loops[state](data, i).end()
+            state = target
+            if rows[state + accept] != DEAD:
+                last_accept_position = i
+                last_accept_token = rows[state + accept]
+
+        if last_accept_token != DEAD:
+            if last_accept_token in keyword_rules:
+                last_accept_token = keywords.get(
+                    data[start:last_accept_position], last_accept_token
+                )
+            yield last_accept_token, start, last_accept_position
+            start = last_accept_position
+        else:
+            end = start + 1
+            if rows[initial + column(data[start], OTHER)] == DEAD:
+                # No token starts with this character: skip the whole run
+                search = search or start_search(table)
+                match = search(data, end)
+                end = match.start() if match else length
+            yield DEAD, start, end
+            start = end
+
+
+def scan_stream(table, file, chunk_size=CHUNK_SIZE):
+    """
+    Same tokenization as `scan`, reading `file` in chunks of `chunk_size`
+    characters. Yields `(token_id, start, end, lexeme)` with offsets counted
+    from the beginning of the file.
+
+    Only the unconsumed tail of the input is kept, so memory is bounded by the
+    chunk size plus the longest lexeme or run of invalid input, whatever the
+    size of the file. Tokens and error runs do not depend on the chunk size.
+    """
+    rows, column = table.rows(), table.columns.get
+    loops = table.self_loops()
+    keywords, keyword_rules = table.keywords, table.keyword_rules
+    accept = table.width
+    initial = table.initial * (table.width + 1)
+    search = None
+
+    buffer, base, eof = "", 0, False
+    start = length = 0
+    while True:
+        if start >= length:
+            if eof:
+                return
+            base += length
+            buffer = file.read(chunk_size)
+            start, length = 0, len(buffer)
+            eof = length == 0
+            continue
+
+        state = initial
+        last_accept_position = start
+        last_accept_token = DEAD
+        i = start
+
+        while True:
+            while i < length:
+                target = rows[state + column(buffer[i], OTHER)]
+                if target == DEAD:
+                    break
+                i += 1
+                if target == state and i < length:
+                    if rows[state + column(buffer[i], OTHER)] == state:
+                        i = loops[state](buffer, i).end()
+                state = target
+                if rows[state + accept] != DEAD:
+                    last_accept_position = i
+                    last_accept_token = rows[state + accept]
+            else:
+                # The lexeme may go on in the next chunk: drop what was
+                # already consumed and keep walking from the same state
+                chunk = "" if eof else file.read(chunk_size)
+                if chunk:
+                    buffer = buffer[start:] + chunk
+                    base += start
+                    i -= start
+                    last_accept_position -= start
+                    start, length = 0, len(buffer)
+                    continue
+                eof = True
+            break
+
+        if last_accept_token != DEAD:
+            lexeme = buffer[start:last_accept_position]
+            if last_accept_token in keyword_rules:
+                last_accept_token = keywords.get(lexeme, last_accept_token)
+            yield last_accept_token, base + start, base + last_accept_position, lexeme
+            start = last_accept_position
+        else:
+            end = start + 1
+            if rows[initial + column(buffer[start], OTHER)] == DEAD:
+                # The run may go on in the next chunk, like a lexeme: it is
+                # extended until a character that can start a token
+                search = search or start_search(table)
+                while True:
+                    match = search(buffer, end)
+                    if match:
+                        end = match.start()
+                        break
+                    chunk = "" if eof else file.read(chunk_size)
+                    if not chunk:
+                        eof = True
+                        end = length
+                        break
+                    buffer = buffer[start:] + chunk
+                    base += start
+                    end = length - start
+                    start, length = 0, len(buffer)
+            yield DEAD, base + start, base + end, buffer[start:end]
+            start = end
+
+
+def byte_keywords(table):
+    # Keywords as the byte strings the byte-level scanners see (Latin-1)
+    return {
+        lexeme.encode("latin-1"): token_id
+        for lexeme, token_id in table.keywords.items()
+        if max(lexeme) < "\u0100"
+    }
+
+
+def scan_bytes(table, data, start=0, stop=None):
+    """
+    Same tokenization as `scan` over a bytes-like object (bytes, mmap, a
+    memoryview of format "B") without decoding it. Every byte is looked up in
+    the table's 256-entry class map, i.e. read as a Latin-1 character, which
+    for specs written in ASCII matches UTF-8 input as well. Yields
+    `(token_id, start, end)` byte offsets; decode `data[start:end]` only for
+    the lexemes that are needed.
+
+    Scanning begins at `start` and yields the tokens that begin before
+    `stop`; the last one may still read past it.
+    """
+    rows, classes = table.rows(), table.class_map.tolist()
+    loops = table.self_loops(binary=True)
+    keywords, keyword_rules = byte_keywords(table), table.keyword_rules
+    accept = table.width
+    initial = table.initial * (table.width + 1)
+    search = None
+    # Bytes are read from `data` itself: a memoryview held open across the
+    # yields would keep an mmap from closing while this generator is alive
+    length = len(data)
+    stop = length if stop is None else min(stop, length)
+
+    while start < stop:
+        state = initial
+        last_accept_position = start
+        last_accept_token = DEAD
+        i = start
+
+        while i < length:
+            target = rows[state + classes[data[i]]]
+            if target == DEAD:
+                break
+            i += 1
+            if target == state and i < length:
+                if rows[state + classes[data[i]]] == state:
+                    i = loops[state](data, i).end()
+            state = target
+            if rows[state + accept] != DEAD:
+                last_accept_position = i
+                last_accept_token = rows[state + accept]
+
+        if last_accept_token != DEAD:
+            if last_accept_token in keyword_rules:
+                last_accept_token = keywords.get(
+                    bytes(data[start:last_accept_position]), last_accept_token
+                )
+            yield last_accept_token, start, last_accept_position
+            start = last_accept_position
+        else:
+            end = start + 1
+            if rows[initial + classes[data[start]]] == DEAD:
+                search = search or start_search(table, binary=True)
+                match = search(data, end)
+                end = match.start() if match else length
+            yield DEAD, start, end
+            start = end
+
+
+@contextmanager
+def open_mapped(file_path):
+    """
+    Maps `file_path` read-only into memory for `scan_bytes`, so large inputs
+    are neither read into a str nor copied.
+    """
+    with open(file_path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            # mmap refuses empty files
+            yield b""
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+def scan_linear(table, data):
+    """
+    Same tokenization as `scan` in guaranteed O(n) total work.
+
+    Plain maximal munch re-reads the characters after the last accepting
+    position for every token, which turns quadratic on inputs full of prefixes
+    of a token that never completes. Here every (state, position) pair walked
+    past the last accept of a token is remembered as failed: the DFA is
+    deterministic, so reaching that pair again can never lead to an accept
+    and the walk stops there. Each pair fails at most once.
+    """
+    rows, column = table.rows(), table.columns.get
+    keywords, keyword_rules = table.keywords, table.keyword_rules
+    accept = table.width
+    initial = table.initial * (table.width + 1)
+    search = None
+    length = len(data)
+    span = len(rows)  # key of a (state, position) pair: position * span + state
+    failed = set()
+
+    start = 0
+    while start < length:
+        state = initial
+        last_accept_position = start
+        last_accept_token = DEAD
+        trail = []
+        i = start
+
+        while i < length:
+            key = i * span + state
+            if key in failed:
+                break
+            trail.append(key)
+            state = rows[state + column(data[i], OTHER)]
+            if state == DEAD:
+                break
+            i += 1
+            if rows[state + accept] != DEAD:
+                last_accept_position = i
+                last_accept_token = rows[state + accept]
+                trail.clear()
+
+        failed.update(trail)
+
+        if last_accept_token != DEAD:
+            if last_accept_token in keyword_rules:
+                last_accept_token = keywords.get(
+                    data[start:last_accept_position], last_accept_token
+                )
+            yield last_accept_token, start, last_accept_position
+            start = last_accept_position
+        else:
+            end = start + 1
+            if rows[initial + column(data[start], OTHER)] == DEAD:
+                # No token starts with this character: skip the whole run
+                search = search or start_search(table)
+                match = search(data, end)
+                end = match.start() if match else length
+            yield DEAD, start, end
+            start = end
+
+
+async def read_chunks(source, chunk_size=CHUNK_SIZE):
+    # Byte chunks of an asyncio.StreamReader or of any async byte iterator
+    if hasattr(source, "read"):
+        while True:
+            chunk = await source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        async for chunk in source:
+            if chunk:
+                yield bytes(chunk)
+
+
+async def scan_async(table, source, chunk_size=CHUNK_SIZE):
+    """
+    Same tokenization as `scan_bytes` over an asyncio.StreamReader or an async
+    iterator of bytes, as an async generator of
+    `(token_id, start, end, lexeme)` with byte offsets and the lexeme as
+    bytes.
+
+    The walk of a token that reaches the end of the received data awaits
+    the next chunk and goes on from the same DFA state, so a token split
+    over two reads is recognized as one, and so is a run of invalid input.
+    Only the unconsumed tail is kept.
+    """
+    rows, classes = table.rows(), table.class_map.tolist()
+    keywords, keyword_rules = byte_keywords(table), table.keyword_rules
+    accept = table.width
+    initial = table.initial * (table.width + 1)
+    search = None
+    chunks = read_chunks(source, chunk_size).__aiter__()
+
+    async def next_chunk():
+        try:
+            return await chunks.__anext__()
+        except StopAsyncIteration:
+            return b""
+
+    buffer, base, eof = b"", 0, False
+    start = length = 0
+    while True:
+        if start >= length:
+            if eof:
+                return
+            base += length
+            buffer = await next_chunk()
+            start, length = 0, len(buffer)
+            eof = length == 0
+            continue
+
+        state = initial
+        last_accept_position = start
+        last_accept_token = DEAD
+        i = start
+
+        while True:
+            while i < length:
+                state = rows[state + classes[buffer[i]]]
+                if state == DEAD:
+                    break
+                i += 1
+                if rows[state + accept] != DEAD:
+                    last_accept_position = i
+                    last_accept_token = rows[state + accept]
+            else:
+                chunk = b"" if eof else await next_chunk()
+                if chunk:
+                    buffer = buffer[start:] + chunk
+                    base += start
+                    i -= start
+                    last_accept_position -= start
+                    start, length = 0, len(buffer)
+                    continue
+                eof = True
+            break
+
+        if last_accept_token != DEAD:
+            lexeme = buffer[start:last_accept_position]
+            if last_accept_token in keyword_rules:
+                last_accept_token = keywords.get(lexeme, last_accept_token)
+            yield last_accept_token, base + start, base + last_accept_position, lexeme
+            start = last_accept_position
+        else:
+            end = start + 1
+            if rows[initial + classes[buffer[start]]] == DEAD:
+                search = search or start_search(table, binary=True)
+                while True:
+                    match = search(buffer, end)
+                    if match:
+                        end = match.start()
+                        break
+                    chunk = b"" if eof else await next_chunk()
+                    if not chunk:
+                        eof = True
+                        end = length
+                        break
+                    buffer = buffer[start:] + chunk
+                    base += start
+                    end = length - start
+                    start, length = 0, len(buffer)
+            yield DEAD, base + start, base + end, buffer[start:end]
+            start = end
@@ -1,8 +1,18 @@
+from bisect import bisect_left
+
 from graphviz import Digraph
 
+from automata.Regex import MAX_CODE, CharSet, repetition_bounds
 from automata.render import render_tree
 
 
+def merge(a, b):
+    if len(a) < len(b):
+        a, b = b, a
+    a |= b
+    return a
+
+
 class Node:
     pos_counter = 0
 
@@ -22,27 +32,130 @@ class SyntaxTree:
         self.posTable = dict()
         self.root = self.create_ast(postfix)
         self.operands = self.regexAlphabet(postfix)
+        self.classes, self.classOf, self.classPosTable = self.character_classes()
 
     def regexAlphabet(self, postfix):
         alphabet = set()
-        reserved = ["|", "*", ".", "ϵ", "ε"]
+        reserved = ["|", "*", ".", "+", "?", "ϵ", "ε"]
 
         i = 0
         while i < len(postfix):
             char = postfix[i]
-            if char[0] == "\\":
+            if isinstance(char, CharSet):
+                alphabet.add(char)
+            elif char[0] == "\\":
                 if len(char) > 1:
                     alphabet.add(char[1])
                 else:
                     alphabet.add(char[0])
-            elif char not in reserved:
+            elif char not in reserved and repetition_bounds(char) is None:
                 alphabet.add(char)
             i += 1
         return alphabet
 
+    def character_classes(self):
+        """
+        Partitions the characters into classes that behave the same at every
+        position, so the DFA needs one column per class instead of one per
+        character. Characters and character sets are cut into elementary
+        intervals at their bounds, and every class is a union of those, so
+        the work depends on the number of bounds, not on how wide a set is.
+
+        Class 0 is the class of the characters past the last bound. It is not
+        listed in `classOf`: every character missing from it is in class 0,
+        which only has transitions when the spec has negated sets.
+        """
+        if self.root is None:
+            return [[]], {}, {}
+
+        # Every DFA state is a union of these sets, so positions that always
+        # appear together and share their followpos can never be told apart.
+        sets = [self.root.firstPos] + list(self.followPosTable.values())
+        membership = {pos: [] for pos in self.followPosTable}
+        for index, positions in enumerate(sets):
+            for pos in positions:
+                membership[pos].append(index)
+
+        groups = {}
+        for pos, indices in membership.items():
+            key = (tuple(indices), frozenset(self.followPosTable[pos]))
+            membership[pos] = groups.setdefault(key, len(groups))
+
+        intervals, others = {}, []
+        for symbol in self.posTable:
+            if isinstance(symbol, CharSet):
+                intervals[symbol] = symbol
+            elif len(symbol) == 1:
+                intervals[symbol] = ((ord(symbol), ord(symbol)),)
+            else:
+                others.append(symbol)
+
+        edges = {0, MAX_CODE + 1}
+        for ranges in intervals.values():
+            for low, high in ranges:
+                edges.update((low, high + 1))
+        bounds = sorted(edges)
+
+        def spanned(low, high):
+            # Elementary intervals making up low..high
+            return range(bisect_left(bounds, low), bisect_left(bounds, high + 1))
+
+        pieces = [set() for _ in range(len(bounds) - 1)]
+        for symbol, ranges in intervals.items():
+            found = {membership[pos] for pos in self.posTable[symbol]}
+            for low, high in ranges:
+                for piece in spanned(low, high):
+                    pieces[piece] |= found
+
+        # Pieces and other symbols occurring in exactly the same groups are
+        # equivalent. The class of the last piece comes first, as class 0
+        found_of = [frozenset(found) for found in pieces]
+        signatures = {found_of[-1]: ([], [])}
+        for piece, found in enumerate(found_of):
+            signatures.setdefault(found, ([], []))[0].append(piece)
+        for symbol in others:
+            signature = frozenset(membership[pos] for pos in self.posTable[symbol])
+            signatures.setdefault(signature, ([], []))[1].append(symbol)
+
+        (other, _), *listed = signatures.items()
+        listed = sorted(
+            (
+                sorted(
+                    [
+                        chr(code)
+                        for piece in members
+                        for code in range(bounds[piece], bounds[piece + 1])
+                    ]
+                    + symbols
+                ),
+                signature,
+            )
+            for signature, (members, symbols) in listed
+        )
+        classes = [[]] + [symbols for symbols, _ in listed]
+        class_of_signature = {other: 0}
+        for class_id, (_, signature) in enumerate(listed, 1):
+            class_of_signature[signature] = class_id
+
+        classOf = {}
+        classPosTable = {class_id: set() for class_id in range(len(classes))}
+        for class_id, symbols in enumerate(classes):
+            for symbol in symbols:
+                classOf[symbol] = class_id
+        for symbol, ranges in intervals.items():
+            for low, high in ranges:
+                for piece in spanned(low, high):
+                    classPosTable[class_of_signature[found_of[piece]]].update(
+                        self.posTable[symbol]
+                    )
+        for symbol in others:
+            classPosTable[classOf[symbol]].update(self.posTable[symbol])
+
+        return classes, classOf, classPosTable
+
     def create_ast(self, postfix):
         stack = []
-        operators = ["|", "*", "."]
+        operators = ["|", "*", ".", "+", "?"]
 
         Node.pos_counter = 0
         self.followPosTable = dict()
@@ -53,6 +166,8 @@ class SyntaxTree:
 
             if char in operators:
                 self.handle_operator(char, new_node, stack)
+            elif repetition_bounds(char) is not None:
+                new_node = self.handle_repetition(char, stack.pop())
             else:
                 self.handle_operand(char, new_node)
 
@@ -62,13 +177,19 @@ class SyntaxTree:
 
     def handle_operator(self, char, new_node, stack):
         new_node.right = stack.pop()
-        if char != "*":
+        if char in "|.":
             new_node.left = stack.pop()
+        self.apply_operator(char, new_node)
 
+    def apply_operator(self, char, new_node):
         if char == "|":
             self.handle_or_operator(new_node)
         elif char == ".":
             self.handle_dot_operator(new_node)
+        elif char == "+":
+            self.handle_plus_operator(new_node)
+        elif char == "?":
+            self.handle_optional_operator(new_node)
         else:  # char == '*'
             self.handle_star_operator(new_node)
 
@@ -92,9 +213,12 @@ class SyntaxTree:
             new_node.lastPos.add(new_node.pos)
 
     def handle_or_operator(self, new_node):
+        # The children's sets are not read again once their parent exists, so
+        # the larger one is extended in place: a long chain of rules joined
+        # by | stays linear instead of copying every prefix of it
         new_node.nullable = new_node.left.nullable or new_node.right.nullable
-        new_node.firstPos = new_node.left.firstPos.union(new_node.right.firstPos)
-        new_node.lastPos = new_node.left.lastPos.union(new_node.right.lastPos)
+        new_node.firstPos = merge(new_node.left.firstPos, new_node.right.firstPos)
+        new_node.lastPos = merge(new_node.left.lastPos, new_node.right.lastPos)
 
     def handle_dot_operator(self, new_node):
         new_node.nullable = new_node.left.nullable and new_node.right.nullable
@@ -120,5 +244,84 @@ class SyntaxTree:
         for i in new_node.lastPos:
             self.followPosTable[i].update(new_node.firstPos)
 
+    def handle_plus_operator(self, new_node):
+        # Like *, without making the node nullable
+        new_node.nullable = new_node.right.nullable
+        new_node.firstPos = new_node.right.firstPos
+        new_node.lastPos = new_node.right.lastPos
+
+        for i in new_node.lastPos:
+            self.followPosTable[i].update(new_node.firstPos)
+
+    def handle_optional_operator(self, new_node):
+        new_node.nullable = True
+        new_node.firstPos = new_node.right.firstPos
+        new_node.lastPos = new_node.right.lastPos
+
+    def handle_repetition(self, char, node):
+        """
+        x{m,n} as m copies of x followed by n - m nested optional ones, and
+        x{m,} as m copies followed by x*. Counting needs one set of positions
+        per copy, so every copy but the first gets fresh positions.
+        """
+        low, high = repetition_bounds(char)
+        count = low + 1 if high is None else high
+        if count == 0:
+            # x{0} only matches the empty string, and the positions of x must
+            # not be left behind to split the character classes
+            self.discard(node)
+            empty = Node(value="ε")
+            self.handle_operand("ε", empty)
+            return empty
+
+        copies = [node] + [self.copy(node) for _ in range(count - 1)]
+        tail = None
+        if high is None:
+            tail = self.unary("*", copies.pop())
+        else:
+            for copy in reversed(copies[low:]):
+                if tail is not None:
+                    copy = self.binary(".", copy, tail)
+                tail = self.unary("?", copy)
+            del copies[low:]
+
+        result = tail
+        for copy in reversed(copies):
+            result = copy if result is None else self.binary(".", copy, result)
+        return result
+
+    def discard(self, node):
+        # Forgets the positions of a subtree that is dropped from the tree
+        if node.left is None and node.right is None:
+            if node.value != "ε":
+                del self.followPosTable[node.pos]
+                self.posTable[node.value].discard(node.pos)
+                if not self.posTable[node.value]:
+                    del self.posTable[node.value]
+            return
+        for child in (node.left, node.right):
+            if child is not None:
+                self.discard(child)
+
+    def unary(self, char, right):
+        new_node = Node(value=char, right=right)
+        self.apply_operator(char, new_node)
+        return new_node
+
+    def binary(self, char, left, right):
+        new_node = Node(value=char, left=left, right=right)
+        self.apply_operator(char, new_node)
+        return new_node
+
+    def copy(self, node):
+        # Same subexpression with fresh positions
+        if node.left is None and node.right is None:
+            new_node = Node(value=node.value)
+            self.handle_operand(node.value, new_node)
+            return new_node
+        if node.left is None:
+            return self.unary(node.value, self.copy(node.right))
+        return self.binary(node.value, self.copy(node.left), self.copy(node.right))
+
     def render(self, graph=None):
         render_tree(self.root)
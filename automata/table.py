@@ -0,0 +1,254 @@
+import json
+import re
+import struct
+import sys
+from array import array
+
+DEAD = -1
+OTHER = 0  # column of the characters that appear in no rule
+
+MAGIC = b"YLEX"
+VERSION = 2
+# magic, version, states, width, initial, metadata bytes, spec hash (sha256)
+HEADER = struct.Struct("<4sHIIII32s")
+
+
+def class_pattern(chars, negated=False):
+    # `re` set of `chars`, or of every other character when `negated`
+    if not chars:
+        return "(?s:.)" if negated else "(?!)"
+    return "[" + "^" * negated + "".join(map(re.escape, chars)) + "]"
+
+
+def column_chars(columns, class_ids, binary=False):
+    # TransitionTable.char_set over any {char: class_id} map
+    negated = OTHER in class_ids
+    chars = sorted(
+        char
+        for char, class_id in columns.items()
+        if (class_id in class_ids) != negated and (not binary or ord(char) < 256)
+    )
+    return "".join(chars), negated
+
+
+class TransitionTable:
+    """
+    Dense integer form of a DirectDFA, used by the generated scanner.
+
+    The transitions are stored as one flat array of `size * width` entries,
+    so a step is `transitions[state * width + class_id]`. Columns are the
+    character classes of the DFA; class 0 collects the characters outside the
+    alphabet, which only negated sets like `[^'"']` can match. `accept` holds
+    the token id of every state (-1 when the state is not accepting).
+
+    `keywords` maps the lexemes of the rules left out of the automaton to
+    their token ids. Scanners look a lexeme up only when its token id is in
+    `keyword_rules`, the rules that accept some keyword.
+    """
+
+    def __init__(self, dfa, rule_tokens, keywords=None):
+        # Characters below 256 go through a flat map, the rest through a dict
+        self.class_map = array("H", [OTHER]) * 256
+        self.wide_classes = {}
+        self.columns = {}
+        for symbol, class_id in dfa.class_of.items():
+            if len(symbol) != 1:
+                continue
+            if ord(symbol) < 256:
+                self.class_map[ord(symbol)] = class_id
+            else:
+                self.wide_classes[symbol] = class_id
+            self.columns[symbol] = class_id
+
+        self.width = len(dfa.classes)
+        self.size = len(dfa.states)
+        self.initial = dfa.initial_state.state_id
+
+        self.transitions = array("i", [DEAD]) * (self.size * self.width)
+        self.accept = array("i", [DEAD]) * self.size
+
+        for state in dfa.states:
+            row = state.state_id * self.width
+            for symbol, next_state_id in state.transitions_ids.items():
+                self.transitions[row + symbol] = next_state_id
+            if state.accepting and state.token_id is not None:
+                self.accept[state.state_id] = state.token_id
+
+        self.labels = [token for token, _ in rule_tokens]
+        self.actions = [action for _, action in rule_tokens]
+        self.keywords = dict(keywords or {})
+        self.keyword_rules = frozenset(self.match(lexeme) for lexeme in self.keywords)
+        self._rows = None
+        self._loops = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_rows"], state["_loops"] = None, {}
+        return state
+
+    def save(self, file_path, spec_hash=""):
+        """
+        Writes the runtime part of the table: a fixed header, the class map,
+        transitions and accept arrays as raw little-endian integers, then the
+        labels, actions and wide classes as JSON. `spec_hash` is the hash of
+        the .yal file the table was built from.
+        """
+        metadata = json.dumps(
+            {
+                "labels": self.labels,
+                "actions": self.actions,
+                "wide_classes": self.wide_classes,
+                "keywords": self.keywords,
+            }
+        ).encode("utf-8")
+
+        arrays = [self.class_map, self.transitions, self.accept]
+        if sys.byteorder == "big":
+            arrays = [array(values.typecode, values) for values in arrays]
+            for values in arrays:
+                values.byteswap()
+
+        with open(file_path, "wb") as file:
+            file.write(
+                HEADER.pack(
+                    MAGIC,
+                    VERSION,
+                    self.size,
+                    self.width,
+                    self.initial,
+                    len(metadata),
+                    bytes.fromhex(spec_hash) if spec_hash else bytes(32),
+                )
+            )
+            for values in arrays:
+                values.tofile(file)
+            file.write(metadata)
+
+    @classmethod
+    def load(cls, file_path, spec_hash=None):
+        """
+        Reads a table written by `save`. When `spec_hash` is given and does not
+        match the one recorded in the file, the table is stale and a
+        ValueError is raised.
+        """
+        with open(file_path, "rb") as file:
+            data = memoryview(file.read())
+
+        if len(data) < HEADER.size:
+            raise ValueError(f"{file_path} is not a compiled lexer")
+        magic, version, size, width, initial, metadata_size, recorded = (
+            HEADER.unpack_from(data)
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{file_path} is not a compiled lexer")
+        if version != VERSION:
+            raise ValueError(f"Unsupported compiled lexer version {version}")
+        if spec_hash is not None and recorded != bytes.fromhex(spec_hash):
+            raise ValueError(f"{file_path} is stale, run lexer.py again")
+
+        table = cls.__new__(cls)
+        table.size, table.width, table.initial = size, width, initial
+
+        offset = HEADER.size
+        for name, typecode, count in (
+            ("class_map", "H", 256),
+            ("transitions", "i", size * width),
+            ("accept", "i", size),
+        ):
+            values = array(typecode)
+            end = offset + count * values.itemsize
+            values.frombytes(data[offset:end])
+            if sys.byteorder == "big":
+                values.byteswap()
+            setattr(table, name, values)
+            offset = end
+
+        metadata = json.loads(bytes(data[offset : offset + metadata_size]))
+        table.labels = metadata["labels"]
+        table.actions = metadata["actions"]
+        table.wide_classes = metadata["wide_classes"]
+        table.keywords = metadata["keywords"]
+
+        table.columns = dict(table.wide_classes)
+        for code, class_id in enumerate(table.class_map):
+            if class_id != OTHER:
+                table.columns[chr(code)] = class_id
+        table.keyword_rules = frozenset(
+            table.match(lexeme) for lexeme in table.keywords
+        )
+        table._rows = None
+        table._loops = {}
+        return table
+
+    def column(self, char):
+        code = ord(char)
+        if code < 256:
+            return self.class_map[code]
+        return self.wide_classes.get(char, OTHER)
+
+    def step(self, state, char):
+        return self.transitions[state * self.width + self.column(char)]
+
+    def match(self, lexeme):
+        # Token id the automaton gives to the whole of `lexeme`
+        state = self.initial
+        for char in lexeme:
+            state = self.step(state, char)
+            if state == DEAD:
+                return DEAD
+        return self.accept[state]
+
+    def char_set(self, class_ids, binary=False):
+        """
+        Characters of the columns in `class_ids` as `(chars, negated)`. Column
+        0 holds every character that is not listed, so when it is among them
+        the set is given by the characters it leaves out instead. With
+        `binary` only characters below 256 are listed.
+        """
+        return column_chars(self.columns, class_ids, binary)
+
+    def rows(self):
+        """
+        Scanner layout of the table: a plain list where every state is a row
+        of `width + 1` slots, targets are already multiplied by that stride
+        and the last slot of the row is the accept token id. Built once and
+        cached, since indexing a list is cheaper than indexing an array.
+        """
+        if self._rows is None:
+            stride = self.width + 1
+            rows = [DEAD] * (self.size * stride)
+            for state in range(self.size):
+                row, offset = state * self.width, state * stride
+                for column in range(self.width):
+                    target = self.transitions[row + column]
+                    if target != DEAD:
+                        rows[offset + column] = target * stride
+                rows[offset + self.width] = self.accept[state]
+            self._rows = rows
+        return self._rows
+
+    def self_loops(self, binary=False):
+        """
+        For every state with transitions back to itself, the `match` of a
+        compiled `[...]*` pattern over the characters it loops on, placed at
+        the state's offset in `rows()` (None elsewhere). Scanners use it to
+        cross a whole run of whitespace, comment or string body in one C-level
+        call. With `binary` the patterns are over bytes read as Latin-1.
+        """
+        if binary not in self._loops:
+            stride = self.width + 1
+            loops = [None] * (self.size * stride)
+            for state in range(self.size):
+                row = state * self.width
+                looping = {
+                    class_id
+                    for class_id in range(self.width)
+                    if self.transitions[row + class_id] == state
+                }
+                if looping:
+                    pattern = class_pattern(*self.char_set(looping, binary)) + "*"
+                    if binary:
+                        pattern = pattern.encode("latin-1")
+                    loops[state * stride] = re.compile(pattern).match
+            self._loops[binary] = loops
+        return self._loops[binary]
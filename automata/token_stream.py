@@ -0,0 +1,158 @@
+import mmap
+import shutil
+import struct
+import tempfile
+
+MAGIC = b"YTOK"
+VERSION = 1
+HAS_LEXEMES = 1
+
+HEADER = struct.Struct("<4sHHQ")  # magic, version, flags, reserved
+RECORD = struct.Struct("<IQQ")  # type id, start, end
+LEXEME_RECORD = struct.Struct("<IQQQ")  # ... and the end of its lexeme in the pool
+FOOTER = struct.Struct("<QQQQ4s")  # records, pool offset, types offset, types, magic
+
+
+class TokenStreamWriter:
+    """
+    Writes a binary token stream incrementally.
+
+    Layout: header, one fixed-size record per token, the optional lexeme pool
+    (UTF-8), the table of interned token type names and a footer with the
+    offsets of each section. Records go straight to the file and lexemes to
+    a temporary file, so memory does not grow with the number of tokens.
+    """
+
+    def __init__(self, file_path, lexemes=False):
+        self.file = open(file_path, "wb")
+        self.lexemes = lexemes
+        self.record = LEXEME_RECORD if lexemes else RECORD
+        self.pool = tempfile.TemporaryFile() if lexemes else None
+        self.pool_size = 0
+        self.types = {}
+        self.count = 0
+        self.file.write(HEADER.pack(MAGIC, VERSION, HAS_LEXEMES if lexemes else 0, 0))
+
+    def write(self, token_type, start, end, lexeme=None):
+        type_id = self.types.setdefault(token_type, len(self.types))
+        if self.lexemes:
+            encoded = (lexeme or "").encode("utf-8")
+            self.pool.write(encoded)
+            self.pool_size += len(encoded)
+            self.file.write(self.record.pack(type_id, start, end, self.pool_size))
+        else:
+            self.file.write(self.record.pack(type_id, start, end))
+        self.count += 1
+
+    def close(self):
+        if self.file.closed:
+            return
+        pool_offset = self.file.tell()
+        if self.lexemes:
+            self.pool.seek(0)
+            shutil.copyfileobj(self.pool, self.file)
+            self.pool.close()
+
+        types_offset = self.file.tell()
+        for token_type in self.types:
+            encoded = token_type.encode("utf-8")
+            self.file.write(struct.pack("<I", len(encoded)) + encoded)
+
+        self.file.write(
+            FOOTER.pack(self.count, pool_offset, types_offset, len(self.types), MAGIC)
+        )
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TokenStreamReader:
+    """
+    Reads a binary token stream through mmap. Records are decoded lazily,
+    either by iterating or by index, so the stream is never turned into one
+    big list.
+    """
+
+    def __init__(self, file_path):
+        with open(file_path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self.data) < HEADER.size + FOOTER.size:
+            raise ValueError("Truncated token stream")
+        magic, version, flags, _ = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a token stream")
+        if version != VERSION:
+            raise ValueError(f"Unsupported token stream version {version}")
+
+        count, pool_offset, types_offset, type_count, magic = FOOTER.unpack_from(
+            self.data, len(self.data) - FOOTER.size
+        )
+        if magic != MAGIC:
+            raise ValueError("Truncated token stream")
+
+        self.lexemes = bool(flags & HAS_LEXEMES)
+        self.record = LEXEME_RECORD if self.lexemes else RECORD
+        self.count = count
+        self.pool_offset = pool_offset
+
+        self.types = []
+        offset = types_offset
+        for _ in range(type_count):
+            (size,) = struct.unpack_from("<I", self.data, offset)
+            self.types.append(self.data[offset + 4 : offset + 4 + size].decode("utf-8"))
+            offset += 4 + size
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError("token index out of range")
+        fields = self.record.unpack_from(
+            self.data, HEADER.size + index * self.record.size
+        )
+        return self.types[fields[0]], fields[1], fields[2]
+
+    def __iter__(self):
+        # unpack_from holds no buffer between tokens, so the reader can be
+        # closed while an iteration is still suspended
+        types, unpack, data = self.types, self.record.unpack_from, self.data
+        end = HEADER.size + self.count * self.record.size
+        for offset in range(HEADER.size, end, self.record.size):
+            fields = unpack(data, offset)
+            yield types[fields[0]], fields[1], fields[2]
+
+    def names(self):
+        # Just the token types, which is what the parser consumes
+        for token_type, _, _ in self:
+            yield token_type
+
+    def lexeme(self, index):
+        if not self.lexemes:
+            raise ValueError("The token stream was written without lexemes")
+        if not 0 <= index < self.count:
+            raise IndexError("token index out of range")
+        base = HEADER.size
+        end = self.record.unpack_from(self.data, base + index * self.record.size)[3]
+        start = 0
+        if index > 0:
+            start = self.record.unpack_from(
+                self.data, base + (index - 1) * self.record.size
+            )[3]
+        return self.data[self.pool_offset + start : self.pool_offset + end].decode(
+            "utf-8"
+        )
+
+    def close(self):
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,161 @@
+import io
+import time
+
+from automata.batch import scan_batch
+from automata.codegen import generate_scanner
+from automata.directDfa import DirectDFA, DirectDFAState
+from automata.Regex import Regex
+from automata.scanner import scan, scan_bytes, scan_linear, scan_stream
+from automata.syntax_tree import SyntaxTree
+from automata.table import OTHER, TransitionTable
+from Yalex import Yalex
+
+YALEX = "examples/java.yal"
+REPEAT = 2000
+ROUNDS = 3
+# `id` must end in "test", so a run of letters is a prefix of a token that
+# never completes and plain longest match re-reads the rest of it each time
+PATHOLOGICAL = "examples/python.yal"
+PATHOLOGICAL_SIZES = (1000, 2000, 4000, 8000)
+DOCUMENTS = 20000  # copies of every SAMPLE line, lexed as separate documents
+
+SAMPLE = """public class Main
+    public static void main ( String args )
+        int count = 0 ;
+        boolean done = false ;
+        while ( count < 100 )
+            if ( count % 7 == 0 && done != true ) count = count + 3 ;
+            else count = count - 1 * 2 / 4 ;
+        return count ;
+"""
+
+
+def baseline_graph(dfa):
+    """
+    The DFA as the scanner before the transition table saw it: DirectDFAState
+    objects whose transitions are keyed by character instead of by class.
+    Class 0 is left out, as those characters had no transitions then.
+    """
+    copies = {
+        state: DirectDFAState(state.state, state.state_id, accepting=state.accepting)
+        for state in dfa.states
+    }
+    for state, copy in copies.items():
+        copy.transitions = {
+            char: copies[target]
+            for class_id, target in state.transitions.items()
+            if class_id != OTHER
+            for char in dfa.classes[class_id]
+        }
+    return copies[dfa.initial_state]
+
+
+def scan_baseline(initial_state, data):
+    # Reference loop: the scanner loop the series started from, one dict
+    # lookup per character on the DFA objects
+    start = 0
+    while start < len(data):
+        current_state = initial_state
+        current_token = ""
+        last_accept_position = start
+        last_accept_state = None
+        i = start
+
+        while i < len(data):
+            char = data[i]
+            if char in current_state.transitions:
+                current_state = current_state.transitions[char]
+                current_token += char
+                if current_state.accepting:
+                    last_accept_position = i + 1
+                    last_accept_state = current_state
+                i += 1
+            else:
+                break
+
+        if last_accept_state:
+            yield last_accept_state, start, last_accept_position
+            start = last_accept_position
+        else:
+            yield None, start, start + 1
+            start += 1
+
+
+def build(file_path):
+    yalex = Yalex(file_path, debug=False)
+    postfix = Regex(yalex.final_regex).shunting_yard()
+    tree = SyntaxTree(postfix)
+    dfa = DirectDFA()
+    dfa.generate_direct_dfa(tree, tree.root)
+    dfa.set_actions(yalex.tokens)
+    dfa.minimize()
+    return dfa, TransitionTable(dfa, yalex.tokens, yalex.keywords)
+
+
+def measure(name, tokenize, data, size=None):
+    # Best of ROUNDS runs, to keep the numbers stable on a busy machine
+    size = len(data) if size is None else size
+    elapsed = float("inf")
+    for _ in range(ROUNDS):
+        begin = time.perf_counter()
+        tokens = sum(1 for _ in tokenize(data))
+        elapsed = min(elapsed, time.perf_counter() - begin)
+    print(
+        f"{name:<14} {tokens:>9} tokens  {elapsed:8.3f}s  "
+        f"{size / elapsed / 1e6:6.2f} MB/s"
+    )
+
+
+begin = time.perf_counter()
+dfa, table = build(YALEX)
+elapsed = time.perf_counter() - begin
+
+table_bytes = (len(table.transitions) + len(table.accept)) * table.transitions.itemsize
+print(
+    f"Built {table.size} states x {table.width} columns in {elapsed:.3f}s "
+    f"({table_bytes} bytes of table)"
+)
+
+direct = {}
+exec(generate_scanner(table), direct)
+
+data = SAMPLE * REPEAT
+print(f"Scanning {len(data) / 1e6:.2f} MB with {YALEX}\n")
+
+initial_state = baseline_graph(dfa)
+measure("baseline", lambda text: scan_baseline(initial_state, text), data)
+measure("table", lambda text: scan(table, text), data)
+measure("direct-coded", direct["scan"], data)
+measure("stream", lambda text: scan_stream(table, io.StringIO(text)), data)
+measure("bytes", lambda text: scan_bytes(table, text), data.encode())
+measure("linear", lambda text: scan_linear(table, text), data)
+
+# Deeply indented lines: long runs in the self-loop of the ws state
+indented = "".join(" " * 32 + line.strip() + "\n" for line in SAMPLE.splitlines())
+indented *= REPEAT
+print(f"\nIndented, {len(indented) / 1e6:.2f} MB\n")
+measure("table", lambda text: scan(table, text), indented)
+measure("bytes", lambda text: scan_bytes(table, text), indented.encode())
+
+documents = SAMPLE.splitlines() * DOCUMENTS
+size = sum(map(len, documents))
+print(f"\n{len(documents)} short documents, {size / 1e6:.2f} MB\n")
+measure(
+    "one by one",
+    lambda texts: (token for text in texts for token in scan(table, text)),
+    documents,
+    size,
+)
+measure(
+    "batch",
+    lambda texts: (token for tokens in scan_batch(table, texts) for token in tokens),
+    documents,
+    size,
+)
+
+_, table = build(PATHOLOGICAL)
+print(f"\nPrefixes of a token that never completes, with {PATHOLOGICAL}\n")
+for size in PATHOLOGICAL_SIZES:
+    data = "a" * size
+    measure(f"table {size}", lambda text: scan(table, text), data)
+    measure(f"linear {size}", lambda text: scan_linear(table, text), data)
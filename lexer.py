@@ -1,115 +1,154 @@
-from pickle import dump
-
+from automata.cache import LexerCache
+from automata.codegen import generate_actions, generate_scanner
 from automata.directDfa import DirectDFA
 from automata.Regex import Regex
+from automata.rules import combine_rules, compile_rules
 from automata.syntax_tree import SyntaxTree
+from automata.table import TransitionTable
 from Yalex import Yalex
 
 YALEX = "donis/slr-1.yal"
 INPUT = "test.txt"
+DIRECT_CODED = False  # emit the DFA as Python code instead of loading dfa.bin
+LINEAR_TIME = False  # scan in guaranteed O(n), reading the whole input at once
+MINIMIZE = True  # merge equivalent DFA states before the table is built
+CACHE_DIR = ".lexer_cache"  # compiled lexers reused across runs, None to always build
+PER_RULE = False  # build every rule on its own (in parallel, cached) and combine them
+LAZY = False  # build the DFA states while scanning instead of ahead of time
+
+
+# The rules are only analyzed when the lexer is not found in the cache
+yalex = Yalex(YALEX, debug=False, resolve=False)
+
+cache = LexerCache(CACHE_DIR) if CACHE_DIR and not LAZY else None
+# Every option that changes the table is part of the key
+options = f"minimize={MINIMIZE},per_rule={PER_RULE}"
+key = cache.key(YALEX, options) if cache else None
+table = cache.get(key) if cache else None
+
+if table is not None:
+    print(f"\nCompiled lexer found in {CACHE_DIR}, skipping the DFA construction")
+elif LAZY:
+    yalex.resolve()
+    print("\nLazy DFA: the states are built by the generated scanner as it runs")
+elif PER_RULE:
+    # Only the rules that changed since the last build are compiled again,
+    # and their tables also answer the keyword analysis
+    rules = [yalex.expand(regex) for regex, _ in yalex.spec_rules]
+    tables = compile_rules(rules, cache)
+    yalex.resolve(tables)
+    dfa = combine_rules([tables[i] for i in yalex.automaton])
+else:
+    yalex.resolve()
+    postfix = Regex(yalex.final_regex).shunting_yard()
+    tree = SyntaxTree(postfix)
+    tree.render()
+
+    dfa = DirectDFA()
+    dfa.generate_direct_dfa(tree, tree.root)
+
+if table is None and not LAZY:
+    print("Final Regex: \n", yalex.final_regex)
+    dfa.set_actions(yalex.tokens)
+    if MINIMIZE:
+        states = len(dfa.states)
+        dfa.minimize()
+        print(f"\nMinimized DFA: {states} -> {len(dfa.states)} states")
+    dfa.render()
+
+    table = TransitionTable(dfa, yalex.tokens, yalex.keywords)
+    if cache:
+        cache.put(key, table)
+
+# A cached table carries the rules in token id order
+tokens = list(zip(table.labels, table.actions)) if table is not None else yalex.tokens
+print("Tokens: \n", tokens, "\n")
+
+actions = generate_actions(tokens)
+
+if LAZY:
+    imports = (
+        "from automata.lazy import LazyDFA, scan_lazy\n"
+        "from automata.table import DEAD"
+    )
+    scanner = """
+
+def scan_stream(table, file):
+    data = file.read()
+    for token_id, start, end in scan_lazy(table, data):
+        yield token_id, start, end, data[start:end]
+"""
+    loader = f"table = LazyDFA.from_regex({yalex.final_regex!r}, {yalex.keywords!r})"
+elif DIRECT_CODED:
+    imports = "from automata.table import DEAD"
+    scanner = f"""
 
+{generate_scanner(table)}
 
-yalex = Yalex(YALEX, debug=False)
-
-print("Tokens: \n", yalex.tokens, "\n")
-print("Final Regex: \n", yalex.final_regex)
-
-postfix = Regex(yalex.final_regex).shunting_yard()
-tree = SyntaxTree(postfix)
-tree.render()
-
-
-dfa = DirectDFA()
-dfa.generate_direct_dfa(tree, tree.root)
-dfa.set_actions(yalex.tokens)
-dfa.render()
+def scan_stream(table, file):
+    data = file.read()
+    for token_id, start, end in scan(data):
+        yield token_id, start, end, data[start:end]
+"""
+    loader = "table = None"
+else:
+    if LINEAR_TIME:
+        imports = "from automata.scanner import scan_linear\nfrom automata.table import DEAD, TransitionTable"
+        scanner = """
+
+def scan_stream(table, file):
+    data = file.read()
+    for token_id, start, end in scan_linear(table, data):
+        yield token_id, start, end, data[start:end]
+"""
+    else:
+        imports = "from automata.scanner import scan_stream\nfrom automata.table import DEAD, TransitionTable"
+        scanner = ""
+    loader = f"""# Fails if dfa.bin was generated from a different spec
+table = TransitionTable.load("dfa.bin", "{yalex.hash}")"""
 
 
 content = f"""# Scanner generated automatically by Yalex. Do not modify this file.
-import pickle
+{imports}
+from automata.errors import ErrorSink
+from automata.positions import LineIndex
+from automata.token_stream import TokenStreamWriter
 {yalex.header}
-def execute_action(action, token):
-    local_namespace = {{}}
-
-    function_code = f'def temporary_function():\\n'
-    if action:
-        function_code += f'    {{action}}\\n'
-    else:
-        print("Empty action detected for token:", token)
-        function_code += f'    pass\\n'
-
-    function_code += 'result = temporary_function()'
-
-    try:
-        exec(function_code, globals(), local_namespace)
-        return local_namespace['result']
-    except Exception as e:
-        # if its not defined, simply print the name of the token    
-        
-  
-
-        print(f"Error executing the action: {{e}}")
-        return None
-
-def recognize_tokens(dfa, file_path):
-
-    recognized_tokens = []
-
-
-    # Read the file
-    with open(file_path, "r") as file:
-        data = file.read()
-        
-    start = 0
-    while start < len(data):
-        current_state = dfa.initial_state
-        current_token = ""
-        last_accept_position = start
-        last_accept_state = None
-        i = start
-
-        while i < len(data):
-            char = data[i]
-            if char in current_state.transitions:
-                current_state = current_state.transitions[char]
-                current_token += char
-                if current_state.accepting:
-                    last_accept_position = i + 1
-                    last_accept_state = current_state
-                i += 1
-            else:
-                break
-
-        if last_accept_state:
-            # Perform action associated with the last accept state
-            recognized_token = data[start:last_accept_position]
-            action_result = execute_action(last_accept_state.action, recognized_token)
-            if action_result is not None:
-                print("Action:", action_result, "from token:", recognized_token)
-                recognized_tokens.append(action_result)
+{actions}{scanner}
+
+def recognize_tokens(table, file_path):
+
+    # Tokens are scanned from the file chunk by chunk and written to
+    # tokens.bin as they come. Errors go to errors.jsonl; lines are only
+    # indexed once an error needs them
+    errors = ErrorSink("errors.jsonl", LineIndex.from_file(file_path))
+    with open(file_path, "r") as file, TokenStreamWriter("tokens.bin", lexemes=True) as output, errors:
+        for token_id, start, end, recognized_token in scan_stream(table, file):
+            if token_id != DEAD:
+                # Perform action associated with the accepted token
+                action_result = execute_action(token_id, recognized_token)
+                if action_result is not None:
+                    print("Action:", action_result, "from token:", recognized_token)
+                    output.write(action_result, start, end, recognized_token)
+                else:
+                    print("Warning: No valid action defined for token:", recognized_token)
             else:
-                print("Warning: No valid action defined for token:", recognized_token)
-            start = last_accept_position
-        else:
-            # No valid transition found, report an error
-            print("Lexical error:", data[start], "at position", start)
-            start += 1
+                # No valid transition found, report the whole invalid run
+                errors.report(start, end, recognized_token)
 
-    # save the tokens to a new file, comma separated
-    with open("tokens.txt", "w") as file:
-        file.write(",".join(recognized_tokens))
+    if errors.count:
+        print("Lexical errors:", errors.count, "(see errors.jsonl)")
 
-with open("dfa.pkl", "rb") as file:
-    dfa = pickle.load(file)
+{loader}
 
-recognize_tokens(dfa, "{INPUT}")
+recognize_tokens(table, "{INPUT}")
     
 {yalex.trailer}
 """
 
-# Save the DFA to a pickle file
-with open("dfa.pkl", "wb") as file:
-    dump(dfa, file)
+# Save the compiled lexer
+if table is not None and not DIRECT_CODED:
+    table.save("dfa.bin", yalex.hash)
 
 # Write the content to a file
 with open("Scan.py", "w") as file:
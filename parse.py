@@ -1,6 +1,7 @@
 import pickle
 
 import LR0
+from automata.token_stream import TokenStreamReader
 
 
 def load_grammar(file_path):
@@ -11,10 +12,8 @@ def load_grammar(file_path):
 
 
 def load_tokens(file_path):
-    with open(file_path, "r") as file:
-        tokens = file.read().split(",")
-
-    return tokens
+    # Records are read lazily from the mapped file, not as one list
+    return TokenStreamReader(file_path)
 
 
 if __name__ == "__main__":
@@ -25,15 +24,17 @@ if __name__ == "__main__":
     print("LR0 saved in lr0_automata.pdf")
     lr0.slr1()
 
-    tokens = load_tokens("tokens.txt")
+    tokens = load_tokens("tokens.bin")
 
-    if tokens is None:
+    if len(tokens) == 0:
         print("No tokens found")
         exit(1)
 
-    print("Parsing tokens:", tokens)
+    print("Parsing", len(tokens), "tokens")
 
-    if lr0.parse(tokens, grammar["ignore"]):
+    if lr0.parse(tokens.names(), grammar["ignore"]):
         print("Accepted")
     else:
         print("Rejected")
+
+    tokens.close()
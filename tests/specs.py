@@ -0,0 +1,56 @@
+import contextlib
+import glob
+import io
+from functools import lru_cache
+
+from automata.directDfa import DirectDFA
+from automata.Regex import Regex
+from automata.syntax_tree import SyntaxTree
+from automata.table import TransitionTable
+from Yalex import Yalex
+
+SPECS = sorted(glob.glob("examples/*.yal") + glob.glob("yal/*.yal"))
+
+# The specs themselves, plus characters no rule lists, a ※ inside a string
+# and a run of invalid input longer than the chunks of the streaming tests
+TEXT = "".join(open(spec).read() for spec in SPECS) + (
+    '\x00\xff é 1.5E+3 12.3 abc_def if iffy classic "a※b" ※ # ※\n'
+    + "\x01" * 40
+    + " end\n"
+)
+LATIN = TEXT.replace("※", "")  # the byte scanners read Latin-1
+
+
+def quiet(function, *args, **kwargs):
+    # Yalex and the DFA print their progress
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+@lru_cache(maxsize=None)
+def load(spec):
+    return quiet(Yalex, spec)
+
+
+@lru_cache(maxsize=None)
+def build_dfa(spec, minimize=True):
+    yalex = load(spec)
+    tree = SyntaxTree(Regex(yalex.final_regex).shunting_yard())
+    dfa = DirectDFA()
+    dfa.generate_direct_dfa(tree, tree.root)
+    dfa.set_actions(yalex.tokens)
+    if minimize:
+        dfa.minimize()
+    return dfa
+
+
+@lru_cache(maxsize=None)
+def build(spec, minimize=True):
+    # TransitionTable of a .yal spec, built the way lexer.py builds it
+    yalex = load(spec)
+    return TransitionTable(build_dfa(spec, minimize), yalex.tokens, yalex.keywords)
+
+
+def compile_spec(path, spec):
+    path.write_text(spec)
+    return build(str(path))
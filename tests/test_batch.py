@@ -0,0 +1,12 @@
+import pytest
+
+from automata.batch import scan_batch
+from automata.scanner import scan
+from tests.specs import SPECS, TEXT, build
+
+
+@pytest.mark.parametrize("spec", SPECS)
+def test_batch(spec):
+    table = build(spec)
+    documents = TEXT.splitlines(keepends=True)
+    assert scan_batch(table, documents) == [list(scan(table, d)) for d in documents]
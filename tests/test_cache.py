@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from automata.cache import LexerCache
+from automata.scanner import scan
+from tests.specs import SPECS, TEXT, build
+
+
+@pytest.mark.parametrize("spec", SPECS)
+def test_cache(spec, tmp_path):
+    table = build(spec)
+    cache = LexerCache(str(tmp_path))
+    key = cache.key(spec, "minimize=True,per_rule=False")
+    assert key != cache.key(spec, "minimize=True,per_rule=True")
+    assert cache.get(key) is None
+
+    cache.put(key, table)
+    assert list(scan(cache.get(key), TEXT)) == list(scan(table, TEXT))
+
+
+def test_hit_evicted_after_loading(tmp_path, monkeypatch):
+    # Another process may remove the entry between the load and the refresh
+    # of its modification time; the table read is still good
+    table = build("yal/slr-1.yal")
+    cache = LexerCache(str(tmp_path))
+    key = cache.key("yal/slr-1.yal", "minimize=True,per_rule=False")
+    cache.put(key, table)
+
+    def evicted(path):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, "utime", evicted)
+    assert list(scan(cache.get(key), TEXT)) == list(scan(table, TEXT))
@@ -0,0 +1,43 @@
+import pytest
+
+from automata.codegen import generate_actions, generate_scanner
+from automata.scanner import scan
+from tests.specs import SPECS, TEXT, build, load
+
+ACTIONS = """
+{
+KIND = "number"
+}
+
+let digit = ['0'-'9']
+
+rule tokens =
+    digit+ { return KIND }
+    | '/' { return 1 / 0 }
+"""
+
+
+def test_actions(tmp_path, capsys):
+    path = tmp_path / "actions.yal"
+    path.write_text(ACTIONS)
+    yalex = load(str(path))
+    namespace = {}
+    exec(yalex.header + "\n" + generate_actions(yalex.tokens), namespace)
+    execute_action, labels = namespace["execute_action"], namespace["LABELS"]
+
+    # The actions see the variables of the header
+    assert execute_action(0, "12") == "number"
+
+    # An action that raises is reported with its rule and yields no token
+    assert execute_action(1, "/") is None
+    assert capsys.readouterr().out == (
+        f"Error executing the action of {labels[1]}: division by zero\n"
+    )
+
+
+@pytest.mark.parametrize("spec", SPECS)
+def test_direct_coded(spec):
+    table = build(spec)
+    namespace = {}
+    exec(generate_scanner(table), namespace)
+    assert list(namespace["scan"](TEXT)) == list(scan(table, TEXT))
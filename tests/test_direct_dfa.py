@@ -0,0 +1,11 @@
+import pytest
+
+from automata.scanner import scan
+from tests.specs import SPECS, TEXT, build
+
+
+@pytest.mark.parametrize("spec", SPECS)
+def test_minimize_keeps_the_tokens(spec):
+    assert list(scan(build(spec), TEXT)) == list(
+        scan(build(spec, minimize=False), TEXT)
+    )
@@ -0,0 +1,34 @@
+import json
+
+from automata.errors import PREVIEW, ErrorSink
+from automata.positions import LineIndex
+
+
+def records(path):
+    with open(path) as file:
+        return [json.loads(line) for line in file]
+
+
+def test_touching_errors_are_merged(tmp_path):
+    path = tmp_path / "errors.jsonl"
+    text = "ok\n\x01\x02\x03 ok \x04"
+    with ErrorSink(str(path), LineIndex(text)) as errors:
+        errors.report(3, 4, text[3:4])
+        errors.report(4, 6, text[4:6])
+        errors.report(10, 11, text[10:11])
+    assert errors.count == 2
+    assert records(path) == [
+        {"start": 3, "end": 6, "text": "\x01\x02\x03", "line": 2, "column": 1},
+        {"start": 10, "end": 11, "text": "\x04", "line": 2, "column": 8},
+    ]
+
+
+def test_preview(tmp_path):
+    # Bytes from scan_bytes are decoded, and long runs keep only their start
+    path = tmp_path / "errors.jsonl"
+    with ErrorSink(str(path)) as errors:
+        errors.report(0, 1, b"\xff")
+        errors.report(1, 100, b"\x01" * 99)
+    assert records(path) == [
+        {"start": 0, "end": 100, "text": "\xff" + "\x01" * (PREVIEW - 1)}
+    ]
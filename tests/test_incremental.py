@@ -0,0 +1,18 @@
+import pytest
+
+from automata.incremental import IncrementalLexer
+from automata.scanner import scan
+from tests.specs import SPECS, TEXT, build
+
+
+@pytest.mark.parametrize("spec", SPECS)
+def test_incremental(spec):
+    table = build(spec)
+    lexer = IncrementalLexer(table, TEXT)
+    assert list(lexer) == list(scan(table, TEXT))
+
+    text = TEXT
+    for offset, deleted, inserted in [(10, 0, "x = 1;"), (200, 5, ""), (0, 3, '"※')]:
+        text = text[:offset] + inserted + text[offset + deleted :]
+        lexer.edit(text, offset, deleted, inserted)
+        assert list(lexer) == list(scan(table, text))
@@ -0,0 +1,14 @@
+import pytest
+
+from automata.lazy import LazyDFA, scan_lazy
+from automata.scanner import scan
+from tests.specs import SPECS, TEXT, build, load
+
+
+@pytest.mark.parametrize("spec", SPECS)
+@pytest.mark.parametrize("max_memory", [1, 1 << 20])
+def test_lazy(spec, max_memory):
+    # A budget of one byte flushes the states on every new one
+    yalex = load(spec)
+    dfa = LazyDFA.from_regex(yalex.final_regex, yalex.keywords, max_memory)
+    assert list(scan_lazy(dfa, TEXT)) == list(scan(build(spec), TEXT))
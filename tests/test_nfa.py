@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+from automata.nfa import NFA, State, Transition
+
+EPSILON = "ϵ"
+
+
+def thompson(postfix):
+    # NFA of a postfix regex over single characters with ., |, * and ?
+    stack = []
+    for char in postfix:
+        start, end = State(), State()
+        if char == ".":
+            (first, middle), (second, end) = stack.pop(-2), stack.pop()
+            middle.add_transition(Transition(EPSILON, second))
+            start = first
+        elif char == "|":
+            for initial, final in (stack.pop(), stack.pop()):
+                start.add_transition(Transition(EPSILON, initial))
+                final.add_transition(Transition(EPSILON, end))
+        elif char in "*?":
+            initial, final = stack.pop()
+            start.add_transition(Transition(EPSILON, initial))
+            start.add_transition(Transition(EPSILON, end))
+            final.add_transition(Transition(EPSILON, end))
+            if char == "*":
+                final.add_transition(Transition(EPSILON, initial))
+        else:
+            start.add_transition(Transition(char, end))
+        stack.append((start, end))
+
+    initial, final = stack.pop()
+    final.is_accepting = True
+    return NFA(initial, final)
+
+
+def simulate(nfa, input_string):
+    # The set-based simulation NFA.run used before the NFA was compiled
+    current_states = nfa.initial_state.epsilon_closure()
+    for character in input_string:
+        next_states = set()
+        for state in current_states:
+            for transition in state.transitions:
+                if transition.input == character:
+                    next_states = next_states.union(
+                        transition.new_state.epsilon_closure()
+                    )
+        current_states = next_states
+    return any(state.is_accepting for state in current_states)
+
+
+def random_postfix(rng, depth):
+    if depth == 0 or rng.random() < 0.3:
+        return rng.choice("abc")
+    op = rng.choice(".|*?")
+    if op in ".|":
+        return random_postfix(rng, depth - 1) + random_postfix(rng, depth - 1) + op
+    return random_postfix(rng, depth - 1) + op
+
+
+@pytest.mark.parametrize(
+    "postfix, accepted, rejected",
+    [
+        # The initial state only reaches the accepting one through ϵ moves
+        ("a*", ["", "a", "aaa"], ["b", "ab"]),
+        ("a?b?.", ["", "a", "b", "ab"], ["ba", "aa"]),
+        ("ab|*c.", ["c", "abbac"], ["", "ca", "abd"]),
+        ("ab.c|", ["ab", "c"], ["a", "abc", "d"]),
+    ],
+)
+def test_match(postfix, accepted, rejected):
+    compiled = thompson(postfix).compile()
+    assert compiled.match_many(accepted) == [True] * len(accepted)
+    assert compiled.match_many(rejected) == [False] * len(rejected)
+    assert compiled.match(rejected[0]) is False
+
+
+def test_match_many_agrees_with_the_set_simulation():
+    rng = random.Random(5)
+    for _ in range(200):
+        nfa = thompson(random_postfix(rng, 4))
+        words = [
+            "".join(rng.choice("abcd") for _ in range(rng.randint(0, 7)))
+            for _ in range(30)
+        ]
+        assert nfa.compile().match_many(words) == [simulate(nfa, w) for w in words]
@@ -0,0 +1,15 @@
+import pytest
+
+from automata import parallel
+from automata.scanner import scan
+from tests.specs import LATIN, SPECS, build
+
+
+@pytest.mark.parametrize("spec", SPECS)
+def test_parallel(spec, tmp_path, monkeypatch):
+    table = build(spec)
+    path = tmp_path / "input.txt"
+    path.write_bytes(LATIN.encode("latin-1"))
+    monkeypatch.setattr(parallel, "MIN_REGION", 0)
+    tokens = list(parallel.scan_parallel(table, str(path), workers=3))
+    assert tokens == list(scan(table, LATIN))
@@ -0,0 +1,42 @@
+import pytest
+
+from automata import positions
+from automata.positions import LineIndex, line_starts
+
+TEXT = "ab\r\ncd\n\nlast"  # CRLF, an empty line, no trailing newline
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+@pytest.mark.parametrize("data", [TEXT, TEXT.encode()])
+def test_line_starts(data, use_numpy, monkeypatch):
+    if not use_numpy:
+        monkeypatch.setattr(positions, "numpy", None)
+    elif positions.numpy is None:
+        pytest.skip("NumPy is not installed")
+    assert list(line_starts(data)) == [4, 7, 8]
+    assert list(line_starts(data, base=10)) == [14, 17, 18]
+    assert list(line_starts(data[:0])) == []
+
+
+def test_position():
+    index = LineIndex(TEXT)
+    assert index.position(0) == (1, 1)
+    assert index.position(2) == (1, 3)  # the \r ends the line
+    assert index.position(4) == (2, 1)
+    assert index.position(7) == (3, 1)
+    assert index.position(8) == (4, 1)
+    assert index.position(len(TEXT) - 1) == (4, 4)
+    assert index.position(len(TEXT)) == (4, 5)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 4096])
+def test_from_file(tmp_path, chunk_size):
+    # Offsets of a file are those of its text read with universal newlines,
+    # as scan_stream reads it
+    path = tmp_path / "input.txt"
+    path.write_bytes(TEXT.encode())
+    index = LineIndex.from_file(str(path), chunk_size)
+    assert list(index.starts()) == [0, 3, 6, 7]
+    assert index.position(0) == (1, 1)
+    assert index.position(3) == (2, 1)
+    assert index.position(10) == (4, 4)
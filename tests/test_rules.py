@@ -0,0 +1,16 @@
+import pytest
+
+from automata.rules import combine_rules, compile_rules
+from automata.scanner import scan
+from automata.table import TransitionTable
+from tests.specs import SPECS, TEXT, build, load
+
+
+@pytest.mark.parametrize("spec", SPECS)
+def test_per_rule(spec):
+    yalex = load(spec)
+    dfa = combine_rules(compile_rules(yalex.rule_regexes, workers=1))
+    dfa.set_actions(yalex.tokens)
+    dfa.minimize()
+    table = TransitionTable(dfa, yalex.tokens, yalex.keywords)
+    assert list(scan(table, TEXT)) == list(scan(build(spec), TEXT))
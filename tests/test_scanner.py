@@ -0,0 +1,73 @@
+import asyncio
+import io
+
+import pytest
+
+from automata.scanner import (
+    open_mapped,
+    scan,
+    scan_async,
+    scan_bytes,
+    scan_linear,
+    scan_stream,
+)
+from automata.table import DEAD
+from tests.specs import LATIN, SPECS, TEXT, build
+
+CHUNK_SIZES = [1, 7, 4096]
+
+
+@pytest.mark.parametrize("spec", SPECS)
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_stream(spec, chunk_size):
+    table = build(spec)
+    tokens = scan_stream(table, io.StringIO(TEXT), chunk_size)
+    assert [token[:3] for token in tokens] == list(scan(table, TEXT))
+
+
+@pytest.mark.parametrize("spec", SPECS)
+def test_bytes(spec):
+    table = build(spec)
+    assert list(scan_bytes(table, LATIN.encode("latin-1"))) == list(scan(table, LATIN))
+
+
+def test_bytes_stopped_early(tmp_path):
+    # The mapping closes while the generator is still suspended on a token
+    table = build("yal/slr-1.yal")
+    path = tmp_path / "input.txt"
+    path.write_bytes(LATIN.encode("latin-1"))
+    with open_mapped(str(path)) as data:
+        tokens = scan_bytes(table, data)
+        first = next(tokens)
+    assert first == next(scan(table, LATIN))
+
+
+@pytest.mark.parametrize("spec", SPECS)
+def test_linear(spec):
+    table = build(spec)
+    assert list(scan_linear(table, TEXT)) == list(scan(table, TEXT))
+
+
+@pytest.mark.parametrize("spec", SPECS)
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_async(spec, chunk_size):
+    table = build(spec)
+    data = LATIN.encode("latin-1")
+
+    async def chunks():
+        for i in range(0, len(data), chunk_size):
+            yield data[i : i + chunk_size]
+
+    async def collect():
+        return [token[:3] async for token in scan_async(table, chunks(), chunk_size)]
+
+    assert asyncio.run(collect()) == list(scan(table, LATIN))
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_error_runs_are_not_split_by_chunks(chunk_size):
+    table = build("yal/slr-1.yal")
+    data = "ab " + "\x01" * 20 + " cd"
+    tokens = [token[:3] for token in scan_stream(table, io.StringIO(data), chunk_size)]
+    assert (DEAD, 3, 23) in tokens
+    assert tokens == list(scan(table, data))
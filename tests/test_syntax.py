@@ -0,0 +1,118 @@
+import pytest
+
+from automata.Regex import END_MARKER, R_END, CharSet, Regex
+from automata.scanner import scan
+from automata.syntax_tree import SyntaxTree
+from tests.specs import compile_spec
+
+STRINGS = """
+let str = '"'[^'"']*'"'
+let comment = '#'[^'\\n']*
+
+rule tokens =
+    str { return STR }
+    | comment { return COMMENT }
+    | [^'"''#'] { return CHAR }
+"""
+STR, COMMENT, CHAR = range(3)
+
+
+def syntax_tree(regex):
+    return SyntaxTree(Regex(f"({regex}){END_MARKER}").shunting_yard())
+
+
+def matches(tree, text):
+    # Followpos simulation straight over the positions of the tree
+    symbol_of = {
+        pos: symbol for symbol, found in tree.posTable.items() for pos in found
+    }
+
+    def accepts(symbol, char):
+        if isinstance(symbol, CharSet):
+            return any(low <= ord(char) <= high for low, high in symbol)
+        return symbol == char
+
+    positions = tree.root.firstPos
+    for char in text:
+        positions = set().union(
+            *(
+                tree.followPosTable[pos]
+                for pos in positions
+                if accepts(symbol_of[pos], char)
+            )
+        )
+    return bool(positions & tree.posTable[R_END])
+
+
+@pytest.mark.parametrize(
+    "regex, accepted, rejected",
+    [
+        ("a{2,3}", ["aa", "aaa"], ["", "a", "aaaa"]),
+        ("a{2,}", ["aa", "aaaaa"], ["", "a"]),
+        ("a{2}", ["aa"], ["a", "aaa"]),
+        ("a{0,1}b", ["b", "ab"], ["aab"]),
+        ("ab{0}c", ["ac"], ["abc"]),
+        ("(a+)?b", ["b", "ab", "aaab"], ["a", "abb"]),
+        ("(ab?)+", ["a", "ab", "aab", "abab"], ["", "b", "abb"]),
+        ("(a{1,2}b?){2}", ["aa", "aba", "abab", "aaaa", "aabaab"], ["a", "aaaaa"]),
+    ],
+)
+def test_repetition(regex, accepted, rejected):
+    tree = syntax_tree(regex)
+    for text in accepted:
+        assert matches(tree, text), text
+    for text in rejected:
+        assert not matches(tree, text), text
+
+
+@pytest.mark.parametrize(
+    "regex, accepted, rejected",
+    [
+        ("['a'-'c''x']+", ["abcx", "xa"], ["", "abd"]),
+        ("[^'a''b']c", ["cc", "xc", "éc", "※c"], ["ac", "bc", "c"]),
+        ("[^'a'-'z']+", ["A0", "\x00\U0010ffff"], ["q", "Aq"]),
+        ("([^'a']b?)?a", ["a", "ba", "bba", "xba"], ["aa", "bbba"]),
+    ],
+)
+def test_classes(regex, accepted, rejected):
+    tree = syntax_tree(regex)
+    for text in accepted:
+        assert matches(tree, text), text
+    for text in rejected:
+        assert not matches(tree, text), text
+
+
+def test_negated_classes():
+    # The characters of a negated set that no other symbol splits off fall in
+    # class 0 with the characters no rule lists, ※ included
+    tree = syntax_tree("[^'a''b']|'a''a'")
+    assert 0 != tree.classOf["a"] != tree.classOf["b"] != 0
+    assert "c" not in tree.classOf and END_MARKER not in tree.classOf
+    assert all(matches(tree, text) for text in ["c", END_MARKER, "aa"])
+    assert not any(matches(tree, text) for text in ["a", "b"])
+
+
+def test_empty_repetition_drops_its_positions():
+    tree = syntax_tree("ab{0}c")
+    assert "b" not in tree.posTable
+    assert set(tree.followPosTable) == {
+        pos for found in tree.posTable.values() for pos in found
+    }
+    # b can never be read, so it stays in class 0 with the unknown characters
+    assert "b" not in tree.classOf
+
+
+def lexemes(table, data):
+    return [(token_id, data[start:end]) for token_id, start, end in scan(table, data)]
+
+
+def test_end_marker_is_matched_as_a_character(tmp_path):
+    # ※ marks the end of a rule inside the joined regex, but in the input
+    # it is a character like any other
+    table = compile_spec(tmp_path / "strings.yal", STRINGS)
+    assert lexemes(table, '"a※b"') == [(STR, '"a※b"')]
+    assert lexemes(table, "# a ※ comment\n※") == [
+        (COMMENT, "# a ※ comment"),
+        (CHAR, "\n"),
+        (CHAR, "※"),
+    ]
@@ -0,0 +1,55 @@
+import pytest
+
+from automata.scanner import scan
+from automata.table import DEAD, OTHER
+from tests.specs import SPECS, TEXT, build, build_dfa
+
+
+def walk(dfa, table, data):
+    # Longest match over the DirectDFA states themselves
+    start = 0
+    while start < len(data):
+        state, i = dfa.initial_state, start
+        last_accept_position, last_accept_token = start, DEAD
+        while i < len(data):
+            state = state.transitions.get(dfa.class_of.get(data[i], OTHER))
+            if state is None:
+                break
+            i += 1
+            if state.accepting:
+                last_accept_position, last_accept_token = i, state.token_id
+
+        if last_accept_token != DEAD:
+            lexeme = data[start:last_accept_position]
+            if last_accept_token in table.keyword_rules:
+                last_accept_token = table.keywords.get(lexeme, last_accept_token)
+            yield last_accept_token, start, last_accept_position
+            start = last_accept_position
+        else:
+            yield DEAD, start, start + 1
+            start += 1
+
+
+def merged(tokens):
+    # The table scanners report a run of invalid input as one token
+    result = []
+    for token in tokens:
+        if result and token[0] == DEAD == result[-1][0] and result[-1][2] == token[1]:
+            result[-1] = (DEAD, result[-1][1], token[2])
+        else:
+            result.append(token)
+    return result
+
+
+@pytest.mark.parametrize("spec", SPECS)
+def test_scan_matches_the_dfa(spec):
+    table = build(spec)
+    assert merged(scan(table, TEXT)) == merged(walk(build_dfa(spec), table, TEXT))
+
+
+def test_match():
+    table = build("yal/slr-1.yal")
+    ws, name = table.match(" \t"), table.match("x1")
+    assert ws != DEAD and name != DEAD and ws != name
+    assert table.match("1x") == DEAD
+    assert table.match("") == DEAD
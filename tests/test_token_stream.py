@@ -0,0 +1,63 @@
+import pytest
+
+from automata.token_stream import FOOTER, TokenStreamReader, TokenStreamWriter
+
+TOKENS = [("id", 0, 3, "abc"), ("str", 4, 12, '"a, b"'), ("ws", 12, 13, "\n")]
+
+
+def write(path, tokens, lexemes):
+    with TokenStreamWriter(str(path), lexemes=lexemes) as writer:
+        for token in tokens:
+            writer.write(*token)
+
+
+@pytest.mark.parametrize("lexemes", [True, False])
+def test_round_trip(tmp_path, lexemes):
+    path = tmp_path / "tokens.bin"
+    write(path, TOKENS, lexemes)
+    with TokenStreamReader(str(path)) as reader:
+        assert reader.lexemes == lexemes
+        assert list(reader) == [token[:3] for token in TOKENS]
+        assert [reader[i] for i in range(len(reader))] == list(reader)
+        assert list(reader.names()) == ["id", "str", "ws"]
+        if lexemes:
+            # Lexemes may hold the commas and newlines of the text format
+            assert [reader.lexeme(i) for i in range(len(reader))] == [
+                token[3] for token in TOKENS
+            ]
+        else:
+            with pytest.raises(ValueError):
+                reader.lexeme(0)
+        with pytest.raises(IndexError):
+            reader[len(TOKENS)]
+
+
+def test_empty(tmp_path):
+    path = tmp_path / "tokens.bin"
+    write(path, [], lexemes=True)
+    with TokenStreamReader(str(path)) as reader:
+        assert len(reader) == 0
+        assert list(reader) == []
+
+
+def test_truncated(tmp_path):
+    path = tmp_path / "tokens.bin"
+    write(path, TOKENS, lexemes=True)
+    data = path.read_bytes()
+
+    path.write_bytes(data[:-1])
+    with pytest.raises(ValueError, match="Truncated"):
+        TokenStreamReader(str(path))
+
+    path.write_bytes(data[:10])
+    with pytest.raises(ValueError, match="Truncated"):
+        TokenStreamReader(str(path))
+
+
+def test_bad_footer(tmp_path):
+    path = tmp_path / "tokens.bin"
+    write(path, TOKENS, lexemes=False)
+    data = path.read_bytes()
+    path.write_bytes(data[: -FOOTER.size] + bytes(FOOTER.size))
+    with pytest.raises(ValueError, match="Truncated"):
+        TokenStreamReader(str(path))